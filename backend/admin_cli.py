@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Admin CLI for local database checks
+===================================
+Single entry point for the check_*/clear_* helper scripts. The app's
+SQLAlchemy engine and models are imported once, and every subcommand in one
+invocation shares the same session, so chained checks pay startup only once:
+
+    python admin_cli.py check-users check-schema check-kb
+    python admin_cli.py clear-kb
+"""
+
+import argparse
+import sys
+
+# Setup path
+sys.path.insert(0, '.')
+
+from sqlalchemy import inspect, text
+
+from app.database import SessionLocal
+from app.models import KnowledgeDocument
+
+SCHEMA_TABLES = ('chat_sessions', 'chat_messages')
+
+
+def print_tables(db):
+    """List all tables in the database"""
+    tables = inspect(db.connection()).get_table_names()
+    print("=== Database Tables ===")
+    if not tables:
+        print("  No tables found")
+    for table in tables:
+        print(f"  - {table}")
+
+
+def check_users(db):
+    """Tables plus the 10 most recent users"""
+    print_tables(db)
+    try:
+        rows = db.execute(text("SELECT id, email, full_name, role FROM users ORDER BY id DESC LIMIT 10"))
+        print("\n=== Recent Users ===")
+        for user in rows:
+            print(f"ID {user[0]}: {user[1]} ({user[2]}) - Role: {user[3]}")
+    except Exception as e:
+        db.rollback()
+        print(f"\nError querying users: {e}")
+
+
+def check_schema(db):
+    """Tables plus the chat table columns"""
+    print_tables(db)
+    inspector = inspect(db.connection())
+    for table in SCHEMA_TABLES:
+        print(f"\n=== {table} table schema ===")
+        if not inspector.has_table(table):
+            print("No columns found!")
+            continue
+        for column in inspector.get_columns(table):
+            print(f"{column['name']:25} {str(column['type']):15}")
+
+
+def check_kb(db):
+    """Knowledge base documents tracked in the database"""
+    docs = db.query(KnowledgeDocument).all()
+    print(f'Total documents in DB: {len(docs)}')
+    print(f'\nDocuments:')
+    for d in docs:
+        print(f'  - {d.filename}')
+        print(f'    Chunks: {d.chunk_count}, Size: {d.file_size/1024/1024:.1f}MB')
+        print(f'    Indexed: {d.is_indexed}, UUID: {d.document_id}')
+        print()
+
+
+def clear_kb(db):
+    """Delete all knowledge base document records"""
+    try:
+        count = db.query(KnowledgeDocument).count()
+        print(f"[INFO] Documents in KB: {count}")
+        if count > 0:
+            db.query(KnowledgeDocument).delete()
+            db.commit()
+            print(f"[OK] Deleted {count} documents")
+        else:
+            print("[INFO] KB already empty")
+    except Exception as e:
+        print(f"[ERROR] Database error: {e}")
+        db.rollback()
+
+
+COMMANDS = {
+    'check-users': check_users,
+    'check-schema': check_schema,
+    'check-kb': check_kb,
+    'clear-kb': clear_kb,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local database checks (one session for all commands)")
+    parser.add_argument('commands', nargs='+', choices=list(COMMANDS), metavar='command',
+                        help=f"one or more of: {', '.join(COMMANDS)}")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        for i, name in enumerate(args.commands):
+            if i:
+                print()
+            COMMANDS[name](db)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
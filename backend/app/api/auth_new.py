@@ -16,9 +16,10 @@ from app.database import get_db
 from app.crud import (
     get_user_by_email,
     create_user,
-    authenticate_user,
+    authenticate_user_async,
     get_user_by_id,
 )
+from app.utils.security import hash_password_async
 from app.models import User
 
 # Load environment once at startup - not at import time
@@ -164,14 +165,16 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
                 detail="Email already registered"
             )
         
-        # Create new user with hashed password
+        # Create new user with hashed password (bcrypt runs off the event loop)
+        hashed_password = await hash_password_async(request.password)
         user = create_user(
             db=db,
             email=request.email,
-            password=request.password,
+            password=None,
             full_name=request.full_name,
             role=request.role,
             license_number=request.license_number,
+            hashed_password=hashed_password,
         )
         
         logger.info(f"User created successfully: {user.email} (ID: {user.id})")
@@ -199,7 +202,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     try:
         logger.info(f"Login attempt for email: {request.email}")
         
-        user = authenticate_user(db, request.email, request.password)
+        user = await authenticate_user_async(db, request.email, request.password)
         if not user:
             logger.warning(f"Login failed for {request.email}: Invalid credentials")
             raise HTTPException(
@@ -536,7 +539,8 @@ async def reset_password(
         
         # Update password
         from app.crud import update_user_password
-        update_user_password(db, user.id, request.new_password)
+        hashed_password = await hash_password_async(request.new_password)
+        update_user_password(db, user.id, request.new_password, hashed_password=hashed_password)
         
         return {"message": "Password successfully reset. You can now login with your new password."}
         
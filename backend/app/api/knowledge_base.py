@@ -7,6 +7,7 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Backgro
 from fastapi.responses import JSONResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
 import os
 import logging
 from pathlib import Path
@@ -27,6 +28,23 @@ import os
 import openai
 from app.services.online_knowledge_service import OnlineKnowledgeService
 
+try:
+    import orjson
+    
+    def _read_task_file(path: Path) -> Dict[str, Any]:
+        return orjson.loads(path.read_bytes())
+    
+    def _write_task_file(path: Path, data: Dict[str, Any]):
+        path.write_bytes(orjson.dumps(data))
+except ImportError:
+    import json
+    
+    def _read_task_file(path: Path) -> Dict[str, Any]:
+        return json.loads(path.read_bytes())
+    
+    def _write_task_file(path: Path, data: Dict[str, Any]):
+        path.write_text(json.dumps(data), encoding='utf-8')
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["knowledge-base"])
@@ -71,6 +89,29 @@ MAX_TOTAL_SIZE = 5 * 1024 * 1024 * 1024  # 5GB total
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".doc", ".docx"}
 UPLOAD_DIR = Path("data/knowledge_base/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Uploads are copied to disk 1MB at a time
+
+
+def upload_size(file: UploadFile) -> int:
+    """Size of an upload from its spooled file, without reading it"""
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def save_upload(file: UploadFile, dest: Path) -> tuple:
+    """Stream an upload to dest in chunks, hashing as it goes. Returns (size, sha256 hex)"""
+    file_hash = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    with open(dest, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            file_hash.update(chunk)
+            size += len(chunk)
+    return size, file_hash.hexdigest()
+
 
 def infer_year_from_name(name: str) -> Optional[int]:
     import re
@@ -156,9 +197,8 @@ async def upload_pdfs(
                 detail=f"File {file.filename} has unsupported type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
             )
         
-        # Read file to check size
-        content = await file.read()
-        file_size = len(content)
+        # Check size without reading the upload into memory
+        file_size = upload_size(file)
         
         if file_size > MAX_FILE_SIZE:
             raise HTTPException(
@@ -167,9 +207,6 @@ async def upload_pdfs(
             )
         
         total_size += file_size
-        
-        # Reset file pointer
-        await file.seek(0)
     
     if total_size > MAX_TOTAL_SIZE:
         raise HTTPException(
@@ -182,6 +219,7 @@ async def upload_pdfs(
     knowledge_base = get_knowledge_base()
     
     for file in files:
+        file_size = 0
         try:
             logger.info(f"Processing file: {file.filename}")
             
@@ -190,12 +228,8 @@ async def upload_pdfs(
             safe_filename = f"{timestamp}_{file.filename}"
             file_path = UPLOAD_DIR / safe_filename
             
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
-            
-            # Calculate file hash for deduplication
-            file_hash = hashlib.sha256(content).hexdigest()
+            # Stream to disk, calculating the file hash for deduplication on the way
+            file_size, file_hash = await save_upload(file, file_path)
             
             # Check if document already exists
             existing_doc = db.query(KnowledgeDocument).filter(
@@ -222,9 +256,10 @@ async def upload_pdfs(
             doc_uuid = str(uuid.uuid4())
             
             if file_ext == ".pdf":
-                # Use enhanced OCR processor
+                # Use enhanced OCR processor (CPU-bound, so off the event loop)
                 ocr_processor = get_pdf_ocr_processor()
-                pdf_result = ocr_processor.extract_pdf_with_images(
+                pdf_result = await asyncio.to_thread(
+                    ocr_processor.extract_pdf_with_images,
                     file_path,
                     extract_images=extract_images,
                     use_ocr=ocr_enabled,
@@ -236,7 +271,7 @@ async def upload_pdfs(
                 
                 logger.info(f"[EXTRACT] {file.filename}: {len(text_content)} chars, {len(extracted_images)} images, method={extraction_method}")
             elif file_ext == ".txt":
-                text_content = content.decode('utf-8', errors='ignore')
+                text_content = file_path.read_bytes().decode('utf-8', errors='ignore')
             elif file_ext in [".doc", ".docx"]:
                 text_content = await extract_word_text(file_path)
             else:
@@ -249,7 +284,7 @@ async def upload_pdfs(
                     "error": "No text content extracted - PDF may be image-based or encrypted. Try using OCR or saving as text-based PDF.",
                     "chunks": 0,
                     "characters": 0,
-                    "file_size_mb": len(content) / 1024 / 1024
+                    "file_size_mb": file_size / 1024 / 1024
                 })
                 continue
             
@@ -261,7 +296,7 @@ async def upload_pdfs(
                     "error": f"Insufficient text extracted ({len(text_content)} chars). PDF appears to be image-based. OCR required.",
                     "chunks": 0,
                     "characters": len(text_content),
-                    "file_size_mb": len(content) / 1024 / 1024
+                    "file_size_mb": file_size / 1024 / 1024
                 })
                 continue
             
@@ -291,7 +326,7 @@ async def upload_pdfs(
                     filename=file.filename,
                     file_path=str(file_path),
                     file_hash=file_hash,
-                    file_size=len(content),
+                    file_size=file_size,
                     extension=file_ext,
                     text_length=len(text_content),
                     chunk_count=1,
@@ -309,7 +344,7 @@ async def upload_pdfs(
                     "document_id": doc_uuid,
                     "chunks": 1,
                     "characters": len(text_content),
-                    "size_mb": len(content) / 1024 / 1024,
+                    "size_mb": file_size / 1024 / 1024,
                     "images_extracted": len(extracted_images),
                     "extraction_method": extraction_method,
                     "embedding_status": "queued_for_background_processing",
@@ -317,7 +352,7 @@ async def upload_pdfs(
                 })
             else:
                 # Intelligent chunking with reduced overlap for speed
-                chunks = smart_chunk_text(text_content, chunk_size=chunk_size, overlap=50)
+                chunks = await asyncio.to_thread(smart_chunk_text, text_content, chunk_size=chunk_size, overlap=50)
                 
                 chunk_ids = []
                 for i, chunk in enumerate(chunks):
@@ -346,7 +381,7 @@ async def upload_pdfs(
                     filename=file.filename,
                     file_path=str(file_path),
                     file_hash=file_hash,
-                    file_size=len(content),
+                    file_size=file_size,
                     extension=file_ext,
                     text_length=len(text_content),
                     chunk_count=len(chunks),
@@ -366,7 +401,7 @@ async def upload_pdfs(
                     "chunks": len(chunks),
                     "characters": len(text_content),
                     "avg_chunk_size": len(text_content) // len(chunks) if chunks else 0,
-                    "size_mb": len(content) / 1024 / 1024,
+                    "size_mb": file_size / 1024 / 1024,
                     "images_extracted": len(extracted_images),
                     "extraction_method": extraction_method,
                     "embedding_status": "queued_for_background_processing",
@@ -390,7 +425,7 @@ async def upload_pdfs(
                 "error": full_error,
                 "chunks": 0,
                 "characters": 0,
-                "file_size_mb": len(content) / 1024 / 1024 if 'content' in locals() else 0
+                "file_size_mb": file_size / 1024 / 1024
             })
     
     # Summary
@@ -607,17 +642,15 @@ async def add_to_knowledge_base(kb, text: str, source: str, metadata: Dict[str,
         task_id = hashlib.md5(f"{source}{datetime.now().isoformat()}".encode()).hexdigest()[:16]
         pending_file = temp_dir / f"{task_id}.json"
         
-        import json
-        with open(pending_file, 'w') as f:
-            json.dump({
-                "task_id": task_id,
-                "source": source,
-                "text": text[:10000],  # Store first 10KB inline
-                "text_length": len(text),
-                "metadata": full_metadata,
-                "created_at": datetime.now().isoformat(),
-                "status": "pending"
-            }, f)
+        _write_task_file(pending_file, {
+            "task_id": task_id,
+            "source": source,
+            "text": text[:10000],  # Store first 10KB inline
+            "text_length": len(text),
+            "metadata": full_metadata,
+            "created_at": datetime.now().isoformat(),
+            "status": "pending"
+        })
         
         # Schedule async processing (non-blocking)
         asyncio.create_task(
@@ -650,13 +683,10 @@ async def _process_document_async(kb, text: str, source: str, metadata: Dict[str
         from pathlib import Path
         pending_file = Path("data/knowledge_base/pending") / f"{task_id}.json"
         if pending_file.exists():
-            import json
-            with open(pending_file, 'r') as f:
-                data = json.load(f)
+            data = _read_task_file(pending_file)
             data['status'] = 'complete'
             data['chunks_added'] = chunks_added
-            with open(pending_file, 'w') as f:
-                json.dump(data, f)
+            _write_task_file(pending_file, data)
         
         logger.info(f"[OK] Background embedding complete: {source} - {chunks_added} chunks (task: {task_id})")
     except Exception as e:
@@ -849,7 +879,6 @@ async def get_statistics():
 async def get_pending_status():
     """Check status of pending document embedding tasks"""
     from pathlib import Path
-    import json
     pending_dir = Path("data/knowledge_base/pending")
     if not pending_dir.exists():
         return {"pending": [], "completed": 0}
@@ -857,8 +886,7 @@ async def get_pending_status():
     pending = []
     for task_file in pending_dir.glob("*.json"):
         try:
-            with open(task_file, 'r') as f:
-                data = json.load(f)
+            data = _read_task_file(task_file)
             pending.append({
                 "task_id": data.get('task_id'),
                 "source": data.get('source'),
@@ -1244,24 +1272,38 @@ async def upload_large_pdf(
         safe_filename = f"{timestamp}_{file.filename}"
         file_path = UPLOAD_DIR / safe_filename
         
-        # Save uploaded file
+        # Save uploaded file in chunks, hashing it on the way
         logger.info(f"Saving large file: {file.filename}")
-        with open(file_path, "wb") as f:
-            # Read and write in chunks to handle large files
-            chunk_size = 1024 * 1024  # 1MB chunks
-            while chunk := await file.read(chunk_size):
-                f.write(chunk)
+        file_size, file_hash = await save_upload(file, file_path)
         
-        file_size_mb = file_path.stat().st_size / 1024 / 1024
+        file_size_mb = file_size / 1024 / 1024
         logger.info(f"Saved {file.filename}: {file_size_mb:.2f} MB")
         
         # Validate file size
-        if file_path.stat().st_size > MAX_FILE_SIZE:
+        if file_size > MAX_FILE_SIZE:
             file_path.unlink()  # Delete oversized file
             raise HTTPException(
                 status_code=400,
                 detail=f"File exceeds maximum size of {MAX_FILE_SIZE / 1024 / 1024:.0f}MB"
             )
+        
+        # Skip re-processing a file that is already in the knowledge base
+        existing_doc = db.query(KnowledgeDocument).filter(
+            KnowledgeDocument.file_hash == file_hash
+        ).first()
+        if existing_doc:
+            logger.info(f"Document {file.filename} already exists (hash: {file_hash})")
+            file_path.unlink()
+            return {
+                "message": "File already uploaded",
+                "results": [{
+                    "filename": file.filename,
+                    "status": "skipped",
+                    "reason": "Document already uploaded",
+                    "existing_document_id": existing_doc.document_id,
+                    "uploaded_at": existing_doc.uploaded_at.isoformat()
+                }]
+            }
 
         # Create processing status record
         doc_uuid = str(uuid.uuid4())
@@ -1311,7 +1353,8 @@ async def upload_large_pdf(
                     add_to_kb=lambda text, source, metadata: add_to_knowledge_base(
                         knowledge_base, text, source, {**metadata, "document_uuid": doc_uuid, "uploaded_by": current_user.email}
                     ),
-                    progress_callback=progress_wrapper
+                    progress_callback=progress_wrapper,
+                    file_hash=file_hash
                 )
 
                 # Create KnowledgeDocument record 
@@ -1337,8 +1380,8 @@ async def upload_large_pdf(
                             document_id=doc_uuid,
                             filename=file.filename,
                             file_path=str(file_path),
-                            file_hash=hashlib.sha256(file.filename.encode()).hexdigest(), # Simplified hash for now
-                            file_size=int(file_path.stat().st_size),
+                            file_hash=file_hash,
+                            file_size=file_size,
                             extension=file_ext,
                             is_indexed=True,
                             uploaded_by_id=current_user.id
@@ -1546,6 +1589,12 @@ def get_online_kb_service() -> OnlineKnowledgeService:
     return _online_kb_service
 
 
+async def close_online_kb_service():
+    """Release the online KB service's pooled HTTP connections"""
+    if _online_kb_service is not None:
+        await _online_kb_service.close()
+
+
 @router.get("/online/search-pubmed")
 async def search_pubmed_online(
     query: str,
@@ -17,15 +17,33 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
 
+# Fast serializer for task payloads/results (large papers_found/result dicts).
+# Falls back to stdlib json when orjson is not installed.
+try:
+    import orjson
+    from kombu.serialization import register
+
+    register(
+        "orjson",
+        lambda obj: orjson.dumps(obj).decode("utf-8"),
+        orjson.loads,
+        content_type="application/x-orjson",
+        content_encoding="utf-8",
+    )
+    TASK_SERIALIZER = "orjson"
+    logger.info("[CELERY] Using orjson serializer")
+except ImportError:
+    TASK_SERIALIZER = "json"
+
 # Celery configuration
 class CeleryConfig:
     broker_url = CELERY_BROKER_URL
     result_backend = CELERY_RESULT_BACKEND
     
     # Task settings
-    task_serializer = "json"
-    accept_content = ["json"]
-    result_serializer = "json"
+    task_serializer = TASK_SERIALIZER
+    accept_content = ["orjson", "json"] if TASK_SERIALIZER == "orjson" else ["json"]
+    result_serializer = TASK_SERIALIZER
     timezone = "UTC"
     enable_utc = True
     
@@ -5,7 +5,7 @@ from typing import Optional, List
 from datetime import datetime
 
 from app.models import User, Conversation, Message, DischargeSummary, UserRole
-from app.utils.security import hash_password, verify_password
+from app.utils.security import hash_password, verify_password, verify_password_async
 
 
 # User CRUD operations
@@ -28,9 +28,11 @@ def create_user(
     license_number: Optional[str] = None,
     oauth_provider: Optional[str] = None,
     oauth_id: Optional[str] = None,
+    hashed_password: Optional[str] = None,
 ) -> User:
-    """Create new user."""
-    hashed_password = hash_password(password) if password else None
+    """Create new user. Pass hashed_password to skip hashing (e.g. already hashed off-loop)."""
+    if hashed_password is None and password:
+        hashed_password = hash_password(password)
     
     user = User(
         email=email,
@@ -57,11 +59,26 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     return user
 
 
-def update_user_password(db: Session, user_id: int, new_password: str) -> Optional[User]:
-    """Update user password."""
+async def authenticate_user_async(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate user with email and password, verifying off the event loop."""
+    user = get_user_by_email(db, email)
+    if not user or not user.hashed_password:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
+
+def update_user_password(
+    db: Session,
+    user_id: int,
+    new_password: str,
+    hashed_password: Optional[str] = None,
+) -> Optional[User]:
+    """Update user password. Pass hashed_password to skip hashing."""
     user = get_user_by_id(db, user_id)
     if user:
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = hashed_password or hash_password(new_password)
         db.commit()
         db.refresh(user)
     return user
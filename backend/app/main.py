@@ -94,6 +94,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"[ERROR] OpenAI check failed: {e}")
     
+    # Shared OpenAI HTTP connection pool (one per app lifecycle)
+    try:
+        from app.utils.ai_service import init_ai_client
+        app.state.openai_http_client = init_ai_client()
+    except Exception as e:
+        logger.error(f"[ERROR] OpenAI client initialization failed: {e}")
+    
     # Pre-load knowledge base (optional)
     try:
         from app.services.vector_knowledge_base import get_vector_knowledge_base
@@ -183,6 +190,43 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Warning stopping queue processor: {e}")
     
+    try:
+        # Persist deferred local KB writes
+        from app.services.local_vector_kb import flush_local_knowledge_base
+        flush_local_knowledge_base()
+    except Exception as e:
+        logger.warning(f"Warning flushing local KB: {e}")
+    
+    try:
+        # Stop bcrypt worker processes
+        from app.utils.security import shutdown_bcrypt_pool
+        shutdown_bcrypt_pool()
+    except Exception as e:
+        logger.warning(f"Warning stopping bcrypt pool: {e}")
+    
+    try:
+        # Stop PDF text worker processes
+        from app.services.pdf_ocr_processor import shutdown_pdf_text_pool
+        shutdown_pdf_text_pool()
+    except Exception as e:
+        logger.warning(f"Warning stopping PDF text pool: {e}")
+    
+    try:
+        # Release pooled OpenAI connections
+        from app.utils.ai_service import close_ai_client
+        await close_ai_client()
+        app.state.openai_http_client = None
+        logger.info("[OK] OpenAI HTTP client closed")
+    except Exception as e:
+        logger.warning(f"Warning closing OpenAI client: {e}")
+    
+    try:
+        # Release pooled PubMed connections
+        from app.api.knowledge_base import close_online_kb_service
+        await close_online_kb_service()
+    except Exception as e:
+        logger.warning(f"Warning closing online KB client: {e}")
+    
     try:
         # Close database connections
         from app.database import engine
@@ -9,7 +9,9 @@ Enhanced Knowledge Base Processor
 import logging
 import base64
 import hashlib
+import io
 import os
+import re
 import json
 from typing import List, Dict, Any, Optional, Tuple, Protocol
 from pathlib import Path
@@ -51,13 +53,31 @@ PYMUPDF_AVAILABLE = _PYMUPDF_AVAILABLE
 OPENAI_AVAILABLE = _OPENAI_AVAILABLE
 PIL_AVAILABLE = _PIL_AVAILABLE
 
+# Long-edge limit and JPEG quality for images sent to OpenAI Vision
+VISION_MAX_EDGE = 1024
+VISION_JPEG_QUALITY = 85
+
+IMAGE_DESCRIPTION_PROMPT = "Describe this medical image in detail. Include: anatomical structures, pathology if visible, diagnostic features, and clinical significance."
+IMAGE_DESCRIPTION_MAX_TOKENS = 300
+
+# Header line ("[Image 2]") opening each answer in a batched Vision response;
+# a bracketed marker on its own line doesn't collide with numbered lists
+# inside the descriptions themselves
+BATCH_ANSWER_HEADER = re.compile(r'^[ \t*#]*\[Image (\d+)\][ \t*]*$', re.MULTILINE | re.IGNORECASE)
+
 
 class EnhancedKBProcessor:
     """
     Enhanced KB with image extraction and online verification
     """
     
-    def __init__(self, storage_dir: str = "data/knowledge_base"):
+    def __init__(self, storage_dir: str = "data/knowledge_base", http_client: Optional[Any] = None):
+        """
+        Args:
+            storage_dir: Knowledge base directory (images go in images/)
+            http_client: Optional shared httpx.Client for the OpenAI client,
+                so batch jobs can size and reuse one connection pool
+        """
         self.storage_dir = Path(storage_dir)
         self.images_dir = self.storage_dir / "images"
         self.images_dir.mkdir(parents=True, exist_ok=True)
@@ -67,14 +87,35 @@ class EnhancedKBProcessor:
         if OPENAI_AVAILABLE and OpenAI is not None:
             api_key = os.getenv("OPENAI_API_KEY")
             if api_key:
-                self.client = OpenAI(api_key=api_key)
+                self.client = OpenAI(api_key=api_key, http_client=http_client)
         
         logger.info("Enhanced KB Processor initialized")
     
-    def extract_text_and_images(self, pdf_path: str) -> Dict[str, Any]:
+    def count_pages(self, pdf_path: str) -> int:
+        """Number of pages in a PDF (0 if it cannot be opened)"""
+        if not PYMUPDF_AVAILABLE or fitz is None:
+            return 0
+        try:
+            with fitz.open(pdf_path) as doc:  # type: ignore
+                return len(doc)  # type: ignore
+        except Exception:
+            return 0
+    
+    def extract_text_and_images(
+        self,
+        pdf_path: str,
+        start_page: int = 0,
+        end_page: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Extract both text and images from PDF
         
+        Args:
+            pdf_path: Path to the PDF
+            start_page: First page to extract (0-based)
+            end_page: Page to stop before (default: end of document), so
+                large PDFs can be split across workers by page range
+        
         Returns:
             {
                 'text_chunks': [{'text': str, 'page': int, 'position': tuple}],
@@ -90,7 +131,10 @@ class EnhancedKBProcessor:
             text_chunks: List[Dict[str, Any]] = []
             images: List[Dict[str, Any]] = []
             
-            for page_num in range(len(doc)):  # type: ignore
+            total_pages = len(doc)  # type: ignore
+            last_page = total_pages if end_page is None else min(end_page, total_pages)
+            
+            for page_num in range(start_page, last_page):
                 page = doc[page_num]  # type: ignore
                 
                 # Extract text with position
@@ -130,8 +174,6 @@ class EnhancedKBProcessor:
                     except Exception as e:
                         logger.warning(f"Failed to extract image {img_index} from page {page_num}: {e}")
             
-            # Get metadata before closing
-            total_pages = len(doc)  # type: ignore
             doc.close()  # type: ignore
             
             return {
@@ -306,14 +348,39 @@ Respond in JSON format:
             })
         return images
     
+    def _prepare_vision_image(self, image_path: str) -> Tuple[bytes, str]:
+        """
+        Image bytes and MIME type to upload for a Vision description.
+        
+        Images larger than VISION_MAX_EDGE on their long side are downscaled
+        and re-encoded as JPEG; Vision bills per 512px tile, so full-size
+        scans cost many times the tokens without a better description.
+        """
+        with open(image_path, 'rb') as img_file:
+            image_bytes = img_file.read()
+        
+        if _PIL_AVAILABLE:
+            try:
+                with Image.open(io.BytesIO(image_bytes)) as img:
+                    if max(img.size) <= VISION_MAX_EDGE:
+                        return image_bytes, Image.MIME.get(img.format or "", "image/png")
+                    img.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    img.convert('RGB').save(buffer, 'JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+                    return buffer.getvalue(), "image/jpeg"
+            except Exception as e:
+                logger.warning(f"Could not downscale {image_path}, sending original: {e}")
+        
+        return image_bytes, "image/png"
+    
     def generate_image_description(self, image_path: str) -> str:
         """Use OpenAI Vision to describe medical images"""
         if not self.client:
             return "Image description not available (OpenAI not configured)"
         
         try:
-            with open(image_path, 'rb') as img_file:
-                image_data = base64.b64encode(img_file.read()).decode('utf-8')
+            image_bytes, mime_type = self._prepare_vision_image(image_path)
+            image_data = base64.b64encode(image_bytes).decode('utf-8')
             
             response = self.client.chat.completions.create(
                 model="gpt-4o",  # Vision model
@@ -322,17 +389,17 @@ Respond in JSON format:
                     "content": [
                         {
                             "type": "text",
-                            "text": "Describe this medical image in detail. Include: anatomical structures, pathology if visible, diagnostic features, and clinical significance."
+                            "text": IMAGE_DESCRIPTION_PROMPT
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_data}"
+                                "url": f"data:{mime_type};base64,{image_data}"
                             }
                         }
                     ]
                 }],
-                max_tokens=300
+                max_tokens=IMAGE_DESCRIPTION_MAX_TOKENS
             )
             
             return response.choices[0].message.content
@@ -340,6 +407,56 @@ Respond in JSON format:
         except Exception as e:
             logger.error(f"Error generating image description: {e}")
             return f"Error: {str(e)}"
+    
+    def generate_image_descriptions_batch(self, image_paths: List[str]) -> List[str]:
+        """
+        Describe several images with one Vision request.
+        
+        The model is asked to open each answer with an [Image N] line.
+        Images whose answer is missing from the response fall back to
+        generate_image_description, so the result always lines up with
+        image_paths.
+        """
+        if len(image_paths) <= 1 or not self.client:
+            return [self.generate_image_description(path) for path in image_paths]
+        
+        try:
+            content: List[Dict[str, Any]] = [{
+                "type": "text",
+                "text": (
+                    f"{IMAGE_DESCRIPTION_PROMPT}\n\nThere are {len(image_paths)} images below. "
+                    "Describe each one in order, starting each description with a line "
+                    f"containing only its marker: [Image 1] through [Image {len(image_paths)}]."
+                )
+            }]
+            for image_path in image_paths:
+                image_bytes, mime_type = self._prepare_vision_image(image_path)
+                image_data = base64.b64encode(image_bytes).decode('utf-8')
+                content.append({
+                    "type": "image_url",
+                    "image_url": {"url": f"data:{mime_type};base64,{image_data}"}
+                })
+            
+            response = self.client.chat.completions.create(
+                model="gpt-4o",  # Vision model
+                messages=[{"role": "user", "content": content}],
+                max_tokens=IMAGE_DESCRIPTION_MAX_TOKENS * len(image_paths)
+            )
+            text = response.choices[0].message.content or ""
+        except Exception as e:
+            logger.error(f"Error generating batched image descriptions: {e}")
+            return [f"Error: {str(e)}"] * len(image_paths)
+        
+        # Split "[Image 1] ... [Image 2] ..." into answers keyed by number
+        answers: Dict[int, str] = {}
+        parts = BATCH_ANSWER_HEADER.split(text)
+        for number, answer in zip(parts[1::2], parts[2::2]):
+            answers.setdefault(int(number), answer.strip())
+        
+        return [
+            answers.get(i) or self.generate_image_description(path)
+            for i, path in enumerate(image_paths, 1)
+        ]
 
 
 # Helper function for API endpoint
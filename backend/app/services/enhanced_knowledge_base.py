@@ -4,9 +4,12 @@ Supports: PDFs, Medical APIs, Local Medical Database, PubMed Integration
 Uses Hybrid Search: Vector (semantic) + Keyword (BM25) + Re-ranking
 """
 
+import heapq
 import logging
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import json
 from datetime import datetime
@@ -26,6 +29,34 @@ try:
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+def _build_keyword_finder(keywords):
+    """
+    Return a function mapping lowercased text to the set of keywords it contains.
+    
+    With pyahocorasick all keywords are found in a single pass over the text;
+    otherwise each keyword is a substring test.
+    """
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        
+        def find_keywords(text: str) -> set:
+            return {keyword for _, keyword in automaton.iter(text)}
+    else:
+        def find_keywords(text: str) -> set:
+            return {keyword for keyword in keywords if keyword in text}
+    
+    return find_keywords
+
 
 class MedicalKnowledgeSource:
     """Base class for medical knowledge sources"""
@@ -41,10 +72,63 @@ class LocalMedicalDatabase(MedicalKnowledgeSource):
     This provides fallback when external APIs are unavailable.
     """
     
+    # List fields matched by search, lowercased once per entry
+    LIST_FIELDS = ("symptoms", "causes", "treatments", "emergency_signs")
+    # Length of the display text prefix used for semantic re-ranking
+    SNIPPET_CHARS = 500
+    
     def __init__(self):
         self.knowledge_base = self._load_medical_knowledge()
+        self._lowered: Dict[str, Dict[str, Any]] = {}
+        # Inverted index: whitespace token -> ids of entries containing it.
+        # A keyword has no whitespace, so it is a substring of a field only if
+        # it is a substring of one of that field's tokens.
+        self._postings: Dict[str, set] = {}
+        self._rank: Dict[str, int] = {}
+        for entry_id, data in self.knowledge_base.items():
+            self._index_entry(entry_id, data)
         logger.info(f"Loaded {len(self.knowledge_base)} medical entries")
     
+    def add_entry(self, entry_id: str, data: Dict[str, Any]):
+        """Add a searchable entry, lowercasing its fields up front"""
+        self.knowledge_base[entry_id] = data
+        self._index_entry(entry_id, data)
+    
+    def _index_entry(self, entry_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache lowercased copies of the searchable fields of an entry"""
+        lowered = {
+            "name": data["name"].lower(),
+            "category": data.get("category", "").lower(),
+        }
+        for field in self.LIST_FIELDS:
+            lowered[field] = [(value, value.lower()) for value in data.get(field, [])]
+        # Display text and its snippet are the same for every query
+        lowered["text"] = self._format_condition(data)
+        lowered["snippet"] = lowered["text"][:self.SNIPPET_CHARS]
+        self._lowered[entry_id] = lowered
+        self._rank.setdefault(entry_id, len(self._rank))
+        
+        texts = [lowered["name"], lowered["category"]]
+        for field in self.LIST_FIELDS:
+            texts.extend(low for _, low in lowered[field])
+        for token in set(" ".join(texts).split()):
+            self._postings.setdefault(token, set()).add(entry_id)
+        return lowered
+    
+    def _candidates(self, find_keywords) -> List[str]:
+        """Ids of entries with at least one keyword hit, in knowledge base order"""
+        # Pick up entries written straight into knowledge_base
+        if len(self._lowered) != len(self.knowledge_base):
+            for entry_id, data in self.knowledge_base.items():
+                if entry_id not in self._lowered:
+                    self._index_entry(entry_id, data)
+        
+        candidates = set()
+        for token, entry_ids in self._postings.items():
+            if find_keywords(token):
+                candidates |= entry_ids
+        return sorted(candidates & self.knowledge_base.keys(), key=self._rank.__getitem__)
+    
     def _load_medical_knowledge(self) -> Dict[str, Dict[str, Any]]:
         """Load comprehensive medical knowledge"""
         return {
@@ -174,56 +258,68 @@ class LocalMedicalDatabase(MedicalKnowledgeSource):
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search local medical database using keyword matching"""
         query_lower = query.lower()
-        # Split query into keywords
-        keywords = query_lower.split()
+        # Split query into keywords, skipping very short words
+        keywords = [keyword for keyword in query_lower.split() if len(keyword) >= 3]
+        if not keywords:
+            return []
+        find_keywords = _build_keyword_finder(set(keywords))
         results = []
         
-        for condition_id, data in self.knowledge_base.items():
+        for condition_id in self._candidates(find_keywords):
+            data = self.knowledge_base[condition_id]
+            lowered = self._lowered[condition_id]
+            
+            # One multi-keyword pass per field
+            name_hits = find_keywords(lowered["name"])
+            category_hits = find_keywords(lowered["category"])
+            symptom_hits = [(symptom, find_keywords(low)) for symptom, low in lowered["symptoms"]]
+            cause_hits = [(cause, find_keywords(low)) for cause, low in lowered["causes"]]
+            treatment_hits = [(treatment, find_keywords(low)) for treatment, low in lowered["treatments"]]
+            sign_hits = [(sign, find_keywords(low)) for sign, low in lowered["emergency_signs"]]
+            
             score = 0.0
             matched_fields = []
             
-            # Check each keyword
+            # Replay the hits in query order
             for keyword in keywords:
-                if len(keyword) < 3:  # Skip very short words
-                    continue
-                
                 # Check name match
-                if keyword in data["name"].lower():
+                if keyword in name_hits:
                     score += 10.0
                     matched_fields.append(f"name:{keyword}")
                 
                 # Check symptoms
-                for symptom in data.get("symptoms", []):
-                    if keyword in symptom.lower():
+                for symptom, hits in symptom_hits:
+                    if keyword in hits:
                         score += 3.0
                         matched_fields.append(f"symptom:{symptom}")
                 
                 # Check causes
-                for cause in data.get("causes", []):
-                    if keyword in cause.lower():
+                for cause, hits in cause_hits:
+                    if keyword in hits:
                         score += 2.0
                         matched_fields.append(f"cause:{cause}")
                 
                 # Check treatments
-                for treatment in data.get("treatments", []):
-                    if keyword in treatment.lower():
+                for treatment, hits in treatment_hits:
+                    if keyword in hits:
                         score += 2.0
                         matched_fields.append(f"treatment:{treatment}")
                 
                 # Check category
-                if keyword in data.get("category", "").lower():
+                if keyword in category_hits:
                     score += 4.0
                     matched_fields.append(f"category:{keyword}")
                 
                 # Check emergency signs
-                for sign in data.get("emergency_signs", []):
-                    if keyword in sign.lower():
+                for sign, hits in sign_hits:
+                    if keyword in hits:
                         score += 5.0  # Higher weight for emergency signs
                         matched_fields.append(f"[WARNING]emergency:{sign}")
             
             if score > 0:
                 results.append({
-                    "text": self._format_condition(data),
+                    "text": lowered["text"],
+                    "snippet": lowered["snippet"],
                     "source": f"Medical Database - {data['name']}",
                     "score": score,
                     "condition_id": condition_id,
@@ -233,9 +329,8 @@ class LocalMedicalDatabase(MedicalKnowledgeSource):
                     "raw_data": data
                 })
         
-        # Sort by score and return top_k
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+        # Top top_k by score (same order as a full stable sort)
+        return heapq.nlargest(top_k, results, key=lambda x: x["score"])
     
     def _format_condition(self, data: Dict[str, Any]) -> str:
         """Format condition data for display"""
@@ -264,6 +359,12 @@ class EnhancedKnowledgeBase:
     Falls back gracefully when external services are unavailable.
     """
     
+    # Recent search results, keyed by normalized query and top_k.
+    # Cleared whenever a document is added.
+    SEARCH_CACHE_MAXSIZE = 512
+    # Embeddings of recently reranked snippets (least recently used evicted first)
+    SNIPPET_EMBEDDING_CACHE_MAXSIZE = 4096
+    
     def __init__(self, storage_dir: str = "data/knowledge_base"):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
@@ -281,6 +382,10 @@ class EnhancedKnowledgeBase:
         
         # Load sentence transformer for better semantic search (optional)
         self.embedder = None
+        self._snippet_embeddings: "OrderedDict[str, Any]" = OrderedDict()
+        self._snippet_embeddings_lock = threading.Lock()
+        self._search_cache: "OrderedDict[Tuple[str, int], List[Dict[str, Any]]]" = OrderedDict()
+        self._search_cache_lock = threading.Lock()
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
                 self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
@@ -293,6 +398,16 @@ class EnhancedKnowledgeBase:
         Hybrid search across all knowledge sources.
         Combines results from multiple sources and re-ranks them.
         """
+        # Keyword matching is case-insensitive and the embedder is uncased
+        key = (" ".join(query.lower().split()), top_k)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                self._search_cache.move_to_end(key)
+        if cached is not None:
+            # Copies, so callers can annotate results without touching the cache
+            return [dict(result) for result in cached]
+        
         all_results = []
         
         # Search each source
@@ -312,16 +427,38 @@ class EnhancedKnowledgeBase:
             except Exception as e:
                 logger.warning(f"Semantic re-ranking failed: {e}")
         
-        # Sort by score and return top results
-        all_results.sort(key=lambda x: x.get("score", 0), reverse=True)
-        return all_results[:top_k]
+        # Top results by score
+        top_results = heapq.nlargest(top_k, all_results, key=lambda x: x.get("score", 0))
+        
+        with self._search_cache_lock:
+            self._search_cache[key] = top_results
+            self._search_cache.move_to_end(key)
+            while len(self._search_cache) > self.SEARCH_CACHE_MAXSIZE:
+                self._search_cache.popitem(last=False)
+        return [dict(result) for result in top_results]
     
     def _semantic_rerank(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Re-rank results using semantic similarity"""
-        query_embedding = self.embedder.encode([query])[0]
+        snippets = [result.get("snippet") or result["text"][:500] for result in results]
         
-        for result in results:
-            text_embedding = self.embedder.encode([result["text"][:500]])[0]
+        # Encode the query and any snippets not seen before in one batch
+        known = {}
+        with self._snippet_embeddings_lock:
+            for snippet in snippets:
+                if snippet not in known and snippet in self._snippet_embeddings:
+                    self._snippet_embeddings.move_to_end(snippet)
+                    known[snippet] = self._snippet_embeddings[snippet]
+        missing = list(dict.fromkeys(s for s in snippets if s not in known))
+        embeddings = self.embedder.encode([query] + missing)
+        query_embedding = embeddings[0]
+        known.update(zip(missing, embeddings[1:]))
+        with self._snippet_embeddings_lock:
+            self._snippet_embeddings.update(zip(missing, embeddings[1:]))
+            while len(self._snippet_embeddings) > self.SNIPPET_EMBEDDING_CACHE_MAXSIZE:
+                self._snippet_embeddings.popitem(last=False)
+        
+        for result, snippet in zip(results, snippets):
+            text_embedding = known[snippet]
             # Cosine similarity
             similarity = np.dot(query_embedding, text_embedding) / (
                 np.linalg.norm(query_embedding) * np.linalg.norm(text_embedding)
@@ -377,14 +514,17 @@ class EnhancedKnowledgeBase:
         if hasattr(self, 'local_db') and self.local_db:
             # Store as a searchable entry
             category = metadata.get("type", "document")
-            self.local_db.knowledge_base[doc_id] = {
+            self.local_db.add_entry(doc_id, {
                 "name": source,
                 "category": category,
                 "text": text[:1000],  # Store first 1000 chars for quick search
                 "full_text": text,
                 "metadata": metadata,
                 "created_at": doc_entry["created_at"]
-            }
+            })
+        
+        with self._search_cache_lock:
+            self._search_cache.clear()
         
         logger.info(f"Added document to enhanced KB: {source} (ID: {doc_id}, {len(text)} chars)")
         return doc_id
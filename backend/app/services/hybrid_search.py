@@ -4,12 +4,16 @@ Uses reciprocal rank fusion (RRF) for optimal results
 """
 
 import logging
+import re
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
 import math
 
 logger = logging.getLogger(__name__)
 
+# Runs of str.isalnum() characters (\w minus the underscore)
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
 # Optional import
 try:
     from rank_bm25 import BM25Okapi
@@ -44,12 +48,19 @@ class HybridSearchEngine:
             logger.warning("BM25 not available, skipping indexing")
             return
         
+        # Reuse tokens of the leading documents whose content is unchanged
+        # (re-indexing after an add only tokenizes the new documents)
+        reused = 0
+        limit = min(len(documents), len(self.documents), len(self.tokenized_docs))
+        while reused < limit and documents[reused].get('content', '') is self.documents[reused].get('content', ''):
+            reused += 1
+        
         self.documents = documents
         
         # Tokenize documents
-        self.tokenized_docs = [
+        self.tokenized_docs = self.tokenized_docs[:reused] + [
             self._tokenize(doc.get('content', ''))
-            for doc in documents
+            for doc in documents[reused:]
         ]
         
         # Build BM25 index
@@ -62,25 +73,8 @@ class HybridSearchEngine:
         Tokenize text for BM25.
         Simple whitespace + punctuation splitting.
         """
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove punctuation and split
-        tokens = []
-        current_token = []
-        
-        for char in text:
-            if char.isalnum():
-                current_token.append(char)
-            else:
-                if current_token:
-                    tokens.append(''.join(current_token))
-                    current_token = []
-        
-        if current_token:
-            tokens.append(''.join(current_token))
-        
-        return tokens
+        # Lowercase, then split on anything that is not alphanumeric
+        return _TOKEN_RE.findall(text.lower())
     
     def bm25_search(self, query: str, top_k: int = 20) -> List[Dict[str, Any]]:
         """
@@ -100,11 +100,14 @@ class LargePDFProcessor:
     async def extract_text_streaming(
         self,
         file_path: Path,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        file_hash: Optional[str] = None
     ) -> Generator[Dict[str, Any], None, None]:
         """
         Extract text from large PDF in streaming mode.
         Yields chunks as they're processed to minimize memory usage.
+        Pass file_hash when the SHA-256 is already known (e.g. computed while
+        the upload was saved) to skip re-reading the file for the cache lookup.
         """
         if not PYMUPDF_AVAILABLE:
             raise ImportError("PyMuPDF required for large PDF processing")
@@ -115,7 +118,7 @@ class LargePDFProcessor:
             raise ValueError(f"File size ({file_size / 1024 / 1024:.2f} MB) exceeds limit ({self.max_file_size / 1024 / 1024:.2f} MB)")
         
         # Check cache
-        file_hash = self.calculate_file_hash(file_path)
+        file_hash = file_hash or self.calculate_file_hash(file_path)
         cached = self.get_cached_extraction(file_hash)
         if cached:
             # Yield cached chunks
@@ -247,7 +250,8 @@ class LargePDFProcessor:
         self,
         file_path: Path,
         add_to_kb: callable,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        file_hash: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process large PDF and add to knowledge base.
@@ -258,7 +262,7 @@ class LargePDFProcessor:
         
         try:
             # Stream extraction and add to KB
-            async for chunk in self.extract_text_streaming(file_path, progress_callback):
+            async for chunk in self.extract_text_streaming(file_path, progress_callback, file_hash):
                 # Add chunk to knowledge base
                 await add_to_kb(
                     text=chunk['text'],
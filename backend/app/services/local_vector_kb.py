@@ -3,8 +3,13 @@ Local Vector Knowledge Base - Uses sentence-transformers instead of OpenAI
 No API costs, no quota limits, runs entirely on your machine
 """
 
+import atexit
 import logging
+import os
 import pickle
+import threading
+import time
+import weakref
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import numpy as np
@@ -28,6 +33,15 @@ except ImportError:
     FAISS_AVAILABLE = False
 
 
+# Deferred persistence: the whole index and metadata pickle are rewritten at
+# most once per this many added documents or seconds, plus on flush()/exit.
+SAVE_EVERY_DOCUMENTS = int(os.getenv("LOCAL_KB_SAVE_EVERY", "20"))
+SAVE_INTERVAL_SECONDS = float(os.getenv("LOCAL_KB_SAVE_INTERVAL", "30"))
+
+# Instances flushed by the exit hook; weak so the hook doesn't keep them alive
+_live_instances: "weakref.WeakSet[LocalVectorKnowledgeBase]" = weakref.WeakSet()
+
+
 class LocalVectorKnowledgeBase:
     """
     100% Local Vector Knowledge Base using sentence-transformers
@@ -83,6 +97,13 @@ class LocalVectorKnowledgeBase:
             self.hybrid_engine = None
         self._bm25_indexed = False
         
+        # Unsaved additions since the last write to disk
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        _live_instances.add(self)
+        
         # Load existing index
         self._load_index()
 
@@ -119,20 +140,47 @@ class LocalVectorKnowledgeBase:
         self.document_count = 0
     
     def _save_index(self):
-        """Save FAISS index and metadata to disk"""
-        try:
-            if FAISS_AVAILABLE and self.index is not None:
-                faiss.write_index(self.index, str(self.index_path))
-            
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump({
-                    'documents': self.documents,
-                    'document_count': self.document_count
-                }, f)
-            
-            logger.info(f"Saved local index with {len(self.documents)} chunks")
-        except Exception as e:
-            logger.error(f"Error saving local index: {e}")
+        """Save FAISS index and metadata to disk (each file replaced atomically)"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            try:
+                if FAISS_AVAILABLE and self.index is not None:
+                    tmp_index = self.index_path.with_suffix('.bin.tmp')
+                    faiss.write_index(self.index, str(tmp_index))
+                    os.replace(tmp_index, self.index_path)
+                
+                tmp_metadata = self.metadata_path.with_suffix('.pkl.tmp')
+                with open(tmp_metadata, 'wb') as f:
+                    pickle.dump({
+                        'documents': self.documents,
+                        'document_count': self.document_count
+                    }, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_metadata, self.metadata_path)
+                
+                self._unsaved = 0
+                self._last_save = time.monotonic()
+                logger.info(f"Saved local index with {len(self.documents)} chunks")
+            except Exception as e:
+                logger.error(f"Error saving local index: {e}")
+    
+    def _schedule_save(self):
+        """Count an unsaved addition and write to disk once enough have piled up;
+        otherwise a timer writes it at most SAVE_INTERVAL_SECONDS after the last save"""
+        self._unsaved += 1
+        elapsed = time.monotonic() - self._last_save
+        if self._unsaved >= SAVE_EVERY_DOCUMENTS or elapsed >= SAVE_INTERVAL_SECONDS:
+            self._save_index()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_INTERVAL_SECONDS - elapsed, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def flush(self):
+        """Write any unsaved additions to disk"""
+        if self._unsaved:
+            self._save_index()
 
     def _rebuild_bm25_index(self):
         """(Re)build BM25 index for hybrid search"""
@@ -196,7 +244,8 @@ class LocalVectorKnowledgeBase:
                 # Note: num_workers removed - not supported in newer sentence-transformers
             )
             logger.info(f"[OK] Generated {len(embeddings)} local embeddings (no API cost)")
-            return [emb.astype('float32') for emb in embeddings]
+            # encode() already returns float32, so this is normally a no-op
+            return list(embeddings.astype('float32', copy=False))
         except Exception as e:
             logger.error(f"Error generating local embeddings: {e}")
             return []
@@ -266,10 +315,12 @@ class LocalVectorKnowledgeBase:
         # Add to FAISS
         if embeddings_batch:
             embeddings_array = np.array(embeddings_batch, dtype='float32')
-            self.index.add(embeddings_array)
-            self.documents.extend(documents_batch)
-            self.document_count += 1
-            self._save_index()
+            # Held so a timed save never writes a half-applied addition
+            with self._save_lock:
+                self.index.add(embeddings_array)
+                self.documents.extend(documents_batch)
+                self.document_count += 1
+            self._schedule_save()
 
             # Rebuild BM25 index so hybrid search includes the new content
             if self.hybrid_engine:
@@ -281,19 +332,15 @@ class LocalVectorKnowledgeBase:
     
     def _chunk_text(self, text: str, chunk_size: int = 2000, overlap: int = 50) -> List[str]:
         """Split text into overlapping chunks"""
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = start + chunk_size
-            chunk = text[start:end]
-            
-            if chunk.strip():
-                chunks.append(chunk)
-            
-            start = end - overlap
+        step = chunk_size - overlap
+        if step <= 0:
+            raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
         
+        # Skip whitespace-only windows without allocating stripped copies
+        chunks = [
+            chunk for chunk in (text[start:start + chunk_size] for start in range(0, len(text), step))
+            if not chunk.isspace()
+        ]
         return chunks if chunks else [text]
 
     def _passes_filters(self, metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
@@ -346,7 +393,7 @@ class LocalVectorKnowledgeBase:
         try:
             # Generate query embedding locally
             query_embedding = self.embedding_model.encode([query], convert_to_numpy=True)[0]
-            query_embedding = query_embedding.astype('float32').reshape(1, -1)
+            query_embedding = query_embedding.astype('float32', copy=False).reshape(1, -1)
             
             # Search FAISS (retrieve extra for filtering)
             k = min(max(top_k * 3, top_k), len(self.documents))
@@ -439,3 +486,15 @@ def get_local_knowledge_base() -> LocalVectorKnowledgeBase:
     if _local_kb_instance is None:
         _local_kb_instance = LocalVectorKnowledgeBase()
     return _local_kb_instance
+
+
+def flush_local_knowledge_base():
+    """Persist unsaved additions of the local knowledge base, if it was created"""
+    if _local_kb_instance is not None:
+        _local_kb_instance.flush()
+
+
+@atexit.register
+def _flush_all_instances():
+    for instance in list(_live_instances):
+        instance.flush()
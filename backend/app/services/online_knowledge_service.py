@@ -9,6 +9,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import json
 import aiofiles
+import httpx
 from pathlib import Path
 import hashlib
 
@@ -19,6 +20,10 @@ CDC_API_BASE = "https://tools.cdc.gov/api"
 WHO_GUIDELINES_URL = "https://www.who.int/publications/guidelines"
 NICE_API_BASE = "https://www.nice.org.uk/guidance"
 
+# PubMed E-utilities calls share one pooled client so repeat lookups reuse
+# keep-alive connections instead of reconnecting per request
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
 
 class OnlineKnowledgeService:
     """
@@ -34,6 +39,19 @@ class OnlineKnowledgeService:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_duration = timedelta(hours=24)  # Cache for 24 hours
         self.initialized = False
+        self._http_client: Optional[httpx.AsyncClient] = None
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared async HTTP client, created on first use"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=15.0)
+        return self._http_client
+    
+    async def close(self):
+        """Close pooled HTTP connections (called on app shutdown)"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
         
     async def initialize(self):
         """Initialize the service"""
@@ -74,7 +92,7 @@ class OnlineKnowledgeService:
                 
         try:
             # PubMed E-utilities API (free, no API key required for basic use)
-            import requests
+            client = self._get_http_client()
             
             # Step 1: Search for article IDs
             search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
@@ -87,7 +105,7 @@ class OnlineKnowledgeService:
                 "reldate": 1825  # Last 5 years
             }
             
-            search_response = requests.get(search_url, params=search_params, timeout=10)
+            search_response = await client.get(search_url, params=search_params, timeout=10)
             search_response.raise_for_status()
             search_data = search_response.json()
             
@@ -105,7 +123,7 @@ class OnlineKnowledgeService:
                 "retmode": "xml"
             }
             
-            fetch_response = requests.get(fetch_url, params=fetch_params, timeout=15)
+            fetch_response = await client.get(fetch_url, params=fetch_params, timeout=15)
             fetch_response.raise_for_status()
             
             # Parse XML response (simplified - in production use proper XML parser)
@@ -335,7 +353,7 @@ class OnlineKnowledgeService:
                 
         try:
             # Search PubMed for recent publications (last 30 days)
-            import requests
+            client = self._get_http_client()
             
             search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
             search_params = {
@@ -347,7 +365,7 @@ class OnlineKnowledgeService:
                 "reldate": 30  # Last 30 days
             }
             
-            response = requests.get(search_url, params=search_params, timeout=10)
+            response = await client.get(search_url, params=search_params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
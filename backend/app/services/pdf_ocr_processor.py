@@ -4,6 +4,8 @@ Supports: Text extraction, OCR for scanned PDFs, Image extraction with indexing
 """
 
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional, Any
 import fitz  # PyMuPDF  # type: ignore
@@ -31,6 +33,76 @@ try:
 except ImportError:
     logger.warning("[OCR] pdf2image not installed")
 
+# PDFs with at least this many pages have their text extracted in contiguous
+# page ranges on a process pool; smaller ones stay in-process.
+PARALLEL_MIN_PAGES = 32
+PDF_TEXT_WORKERS = int(os.getenv("PDF_TEXT_WORKERS", str(os.cpu_count() or 1)))
+
+# Created lazily so importing this module never spawns processes.
+_pdf_text_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pdf_text_pool() -> ProcessPoolExecutor:
+    global _pdf_text_pool
+    if _pdf_text_pool is None:
+        _pdf_text_pool = ProcessPoolExecutor(max_workers=PDF_TEXT_WORKERS)
+    return _pdf_text_pool
+
+
+def shutdown_pdf_text_pool() -> None:
+    """Stop the PDF text worker processes (called on app shutdown)."""
+    global _pdf_text_pool
+    if _pdf_text_pool is not None:
+        _pdf_text_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_text_pool = None
+
+
+def _page_range_text(doc: Any, start: int, stop: int, min_text_per_page: int) -> Tuple[List[str], int, int]:
+    """Page-marked text for pages [start, stop) plus total and text-page counts"""
+    text_parts = []
+    total_text_chars = 0
+    pages_with_text = 0
+    
+    for page_num in range(start, stop):
+        page_text = doc[page_num].get_text("text")
+        text_chars = len(page_text.strip())
+        total_text_chars += text_chars
+        
+        if text_chars > min_text_per_page:
+            pages_with_text += 1
+            text_parts.append(f"\n--- Page {page_num + 1} ---\n{page_text}")
+        else:
+            # Placeholder for OCR or image-only page
+            text_parts.append(f"\n--- Page {page_num + 1} [Image/Scan] ---\n")
+    
+    return text_parts, total_text_chars, pages_with_text
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, min_text_per_page: int) -> Tuple[List[str], int, int]:
+    """Worker: open the PDF and extract text for one page range"""
+    with fitz.open(pdf_path) as doc:
+        return _page_range_text(doc, start, stop, min_text_per_page)
+
+
+def _extract_text_parallel(pdf_path: Path, page_count: int, min_text_per_page: int) -> Tuple[List[str], int, int]:
+    """Split the pages into one contiguous range per worker and merge in page order"""
+    step = -(-page_count // PDF_TEXT_WORKERS)
+    pool = _get_pdf_text_pool()
+    futures = [
+        pool.submit(_extract_page_range, str(pdf_path), start, min(start + step, page_count), min_text_per_page)
+        for start in range(0, page_count, step)
+    ]
+    
+    text_parts = []
+    total_text_chars = 0
+    pages_with_text = 0
+    for future in futures:
+        parts, chars, with_text = future.result()
+        text_parts.extend(parts)
+        total_text_chars += chars
+        pages_with_text += with_text
+    return text_parts, total_text_chars, pages_with_text
+
 
 class PDFOCRProcessor:
     """Enhanced PDF processor with OCR and image extraction capabilities"""
@@ -68,37 +140,29 @@ class PDFOCRProcessor:
             
             logger.info(f"[PDF] Processing {pdf_path.name}: {page_count} pages")
             
-            # Extract text and images
-            text_parts = []
-            extracted_images = []
-            total_text_chars = 0
-            pages_with_text = 0
+            # Extract text (large PDFs across worker processes)
+            text_result = None
+            if page_count >= PARALLEL_MIN_PAGES and PDF_TEXT_WORKERS > 1:
+                try:
+                    text_result = _extract_text_parallel(pdf_path, page_count, self.min_text_per_page)
+                except Exception as e:
+                    logger.warning(f"[PDF] Parallel text extraction failed, using single process: {e}")
+            if text_result is None:
+                text_result = _page_range_text(doc, 0, page_count, self.min_text_per_page)
+            text_parts, total_text_chars, pages_with_text = text_result
             
-            for page_num in range(page_count):
-                page = doc[page_num]
-                
-                # Extract text
-                page_text = page.get_text("text")
-                text_chars = len(page_text.strip())
-                total_text_chars += text_chars
-                
-                if text_chars > self.min_text_per_page:
-                    pages_with_text += 1
-                    text_parts.append(f"\n--- Page {page_num + 1} ---\n{page_text}")
-                else:
-                    # Placeholder for OCR or image-only page
-                    text_parts.append(f"\n--- Page {page_num + 1} [Image/Scan] ---\n")
-                
-                # Extract images from page
-                if extract_images:
+            # Extract images
+            extracted_images = []
+            if extract_images:
+                for page_num in range(page_count):
                     page_images = self._extract_page_images(
-                        page, page_num, pdf_path.stem, document_id
+                        doc[page_num], page_num, pdf_path.stem, document_id
                     )
                     extracted_images.extend(page_images)
-                
-                # Progress logging
-                if (page_num + 1) % 50 == 0:
-                    logger.info(f"[PDF] Processed {page_num + 1}/{page_count} pages")
+                    
+                    # Progress logging
+                    if (page_num + 1) % 50 == 0:
+                        logger.info(f"[PDF] Processed images for {page_num + 1}/{page_count} pages")
             
             doc.close()
             
@@ -24,6 +24,71 @@ except ImportError:
     logger.warning("PyPDF2 not available. Install with: pip install PyPDF2")
     PYPDF2_AVAILABLE = False
 
+# Extraction patterns, compiled once at import and shared by all processors
+VITALS_PATTERNS = {
+    name: re.compile(pattern, re.IGNORECASE) for name, pattern in {
+        'blood_pressure': r'(?:BP|Blood Pressure)[:\s]*(\d{2,3})/(\d{2,3})',
+        'heart_rate': r'(?:HR|Heart Rate)[:\s]*(\d{2,3})\s*(?:bpm|beats)',
+        'temperature': r'(?:Temp|Temperature)[:\s]*(\d{2,3}\.?\d*)\s*°?[CF]',
+        'respiratory_rate': r'(?:RR|Respiratory Rate)[:\s]*(\d{1,3})\s*(?:breaths|/min)',
+        'oxygen_saturation': r'(?:SpO2|O2 Sat|Oxygen Saturation)[:\s]*(\d{2,3})\s*%',
+        'height': r'(?:Height)[:\s]*(\d{2,3}\.?\d*)\s*(?:cm|in)',
+        'weight': r'(?:Weight)[:\s]*(\d{2,3}\.?\d*)\s*(?:kg|lbs)',
+        'bmi': r'(?:BMI)[:\s]*(\d{1,2}\.?\d*)'
+    }.items()
+}
+
+MEDICATION_PATTERN = re.compile(
+    r'(?:^|\n)\d+\.\s*([A-Z][a-z]+(?:\s+[A-Z]?[a-z]+)*)\s+(\d+\s*(?:mg|mcg|g|ml|units?))\s*(?:PO|IV|IM|SC|SL|PR)?',
+    re.MULTILINE
+)
+ICD_PATTERN = re.compile(r'([A-Z]\d{2}(?:\.\d{1,2})?)')
+
+MED_SECTION_PATTERN = re.compile(
+    r'(?:Medications?|Current Medications?|Prescriptions?)[:\s]*(.*?)(?:\n\n|\Z)', re.IGNORECASE | re.DOTALL
+)
+FREQUENCY_PATTERN = re.compile(
+    r'(?:once|twice|three times|four times|QD|BID|TID|QID|PRN)\s*(?:daily|a day)?', re.IGNORECASE
+)
+DX_SECTION_PATTERN = re.compile(
+    r'(?:Diagnos[ie]s?|Impression|Assessment)[:\s]*(.*?)(?:\n\n|\Z)', re.IGNORECASE | re.DOTALL
+)
+ALLERGY_SECTION_PATTERN = re.compile(
+    r'(?:Allergies?|Adverse Reactions?)[:\s]*(.*?)(?:\n\n|\Z)', re.IGNORECASE | re.DOTALL
+)
+SEVERITY_PATTERN = re.compile(r'\b(mild|moderate|severe)\b', re.IGNORECASE)
+LIST_NUMBER_PATTERN = re.compile(r'^\d+\.?\s*')
+BRACKETED_PATTERN = re.compile(r'[(\[].*?[)\]]')
+# Maps ':' to '-' so the first allergy/reaction separator is a plain str.index
+REACTION_SEPARATOR_TABLE = str.maketrans(':', '-')
+
+LAB_PATTERNS = {
+    panel: {test: re.compile(pattern, re.IGNORECASE) for test, pattern in patterns.items()}
+    for panel, patterns in {
+        'cbc': {
+            'wbc': r'(?:WBC|White Blood Cell)[:\s]*(\d+\.?\d*)',
+            'rbc': r'(?:RBC|Red Blood Cell)[:\s]*(\d+\.?\d*)',
+            'hemoglobin': r'(?:Hb|Hemoglobin|Hgb)[:\s]*(\d+\.?\d*)',
+            'hematocrit': r'(?:Hct|Hematocrit)[:\s]*(\d+\.?\d*)',
+            'platelets': r'(?:Plt|Platelets?)[:\s]*(\d+\.?\d*)'
+        },
+        'metabolic': {
+            'glucose': r'(?:Glucose|Blood Sugar)[:\s]*(\d+\.?\d*)',
+            'sodium': r'(?:Na|Sodium)[:\s]*(\d+\.?\d*)',
+            'potassium': r'(?:K|Potassium)[:\s]*(\d+\.?\d*)',
+            'chloride': r'(?:Cl|Chloride)[:\s]*(\d+\.?\d*)',
+            'creatinine': r'(?:Creatinine|Cr)[:\s]*(\d+\.?\d*)',
+            'bun': r'(?:BUN|Blood Urea Nitrogen)[:\s]*(\d+\.?\d*)'
+        },
+        'lipid': {
+            'total_cholesterol': r'(?:Total Cholesterol|Cholesterol)[:\s]*(\d+\.?\d*)',
+            'hdl': r'(?:HDL|HDL Cholesterol)[:\s]*(\d+\.?\d*)',
+            'ldl': r'(?:LDL|LDL Cholesterol)[:\s]*(\d+\.?\d*)',
+            'triglycerides': r'(?:Triglycerides|TG)[:\s]*(\d+\.?\d*)'
+        }
+    }.items()
+}
+
 
 class MedicalReportProcessor:
     """
@@ -37,20 +102,9 @@ class MedicalReportProcessor:
     
     def __init__(self):
         """Initialize the medical report processor"""
-        self.vitals_patterns = {
-            'blood_pressure': r'(?:BP|Blood Pressure)[:\s]*(\d{2,3})/(\d{2,3})',
-            'heart_rate': r'(?:HR|Heart Rate)[:\s]*(\d{2,3})\s*(?:bpm|beats)',
-            'temperature': r'(?:Temp|Temperature)[:\s]*(\d{2,3}\.?\d*)\s*°?[CF]',
-            'respiratory_rate': r'(?:RR|Respiratory Rate)[:\s]*(\d{1,3})\s*(?:breaths|/min)',
-            'oxygen_saturation': r'(?:SpO2|O2 Sat|Oxygen Saturation)[:\s]*(\d{2,3})\s*%',
-            'height': r'(?:Height)[:\s]*(\d{2,3}\.?\d*)\s*(?:cm|in)',
-            'weight': r'(?:Weight)[:\s]*(\d{2,3}\.?\d*)\s*(?:kg|lbs)',
-            'bmi': r'(?:BMI)[:\s]*(\d{1,2}\.?\d*)'
-        }
-        
-        self.medication_pattern = r'(?:^|\n)\d+\.\s*([A-Z][a-z]+(?:\s+[A-Z]?[a-z]+)*)\s+(\d+\s*(?:mg|mcg|g|ml|units?))\s*(?:PO|IV|IM|SC|SL|PR)?'
-        
-        self.icd_pattern = r'([A-Z]\d{2}(?:\.\d{1,2})?)'
+        self.vitals_patterns = VITALS_PATTERNS
+        self.medication_pattern = MEDICATION_PATTERN
+        self.icd_pattern = ICD_PATTERN
         
     def extract_text_from_pdf(self, file_path: str) -> str:
         """
@@ -68,12 +122,8 @@ class MedicalReportProcessor:
         # Try PyMuPDF first (better text extraction)
         if PYMUPDF_AVAILABLE:
             try:
-                doc = fitz.open(file_path)
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-                doc.close()
-                return text
+                with fitz.open(file_path) as doc:
+                    return "".join([page.get_text() for page in doc])
             except Exception as e:
                 logger.error(f"PyMuPDF extraction failed: {e}")
         
@@ -82,10 +132,7 @@ class MedicalReportProcessor:
             try:
                 with open(file_path, 'rb') as file:
                     reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text()
-                    return text
+                    return "".join([page.extract_text() for page in reader.pages])
             except Exception as e:
                 logger.error(f"PyPDF2 extraction failed: {e}")
         
@@ -104,7 +151,7 @@ class MedicalReportProcessor:
         vitals = {}
         
         for vital_name, pattern in self.vitals_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 if vital_name == 'blood_pressure':
                     vitals[vital_name] = f"{match.group(1)}/{match.group(2)}"
@@ -134,14 +181,13 @@ class MedicalReportProcessor:
         medications = []
         
         # Look for medication sections
-        med_section_pattern = r'(?:Medications?|Current Medications?|Prescriptions?)[:\s]*(.*?)(?:\n\n|\Z)'
-        med_section_match = re.search(med_section_pattern, text, re.IGNORECASE | re.DOTALL)
+        med_section_match = MED_SECTION_PATTERN.search(text)
         
         if med_section_match:
             med_text = med_section_match.group(1)
             
             # Extract individual medications
-            for match in re.finditer(self.medication_pattern, med_text, re.MULTILINE):
+            for match in self.medication_pattern.finditer(med_text):
                 med = {
                     'name': match.group(1).strip(),
                     'dose': match.group(2).strip()
@@ -149,8 +195,7 @@ class MedicalReportProcessor:
                 
                 # Try to extract frequency
                 med_line = match.group(0)
-                freq_pattern = r'(?:once|twice|three times|four times|QD|BID|TID|QID|PRN)\s*(?:daily|a day)?'
-                freq_match = re.search(freq_pattern, med_line, re.IGNORECASE)
+                freq_match = FREQUENCY_PATTERN.search(med_line)
                 if freq_match:
                     med['frequency'] = freq_match.group(0).strip()
                 
@@ -175,59 +220,15 @@ class MedicalReportProcessor:
             'other': {}
         }
         
-        # CBC patterns
-        cbc_patterns = {
-            'wbc': r'(?:WBC|White Blood Cell)[:\s]*(\d+\.?\d*)',
-            'rbc': r'(?:RBC|Red Blood Cell)[:\s]*(\d+\.?\d*)',
-            'hemoglobin': r'(?:Hb|Hemoglobin|Hgb)[:\s]*(\d+\.?\d*)',
-            'hematocrit': r'(?:Hct|Hematocrit)[:\s]*(\d+\.?\d*)',
-            'platelets': r'(?:Plt|Platelets?)[:\s]*(\d+\.?\d*)'
-        }
-        
-        # Metabolic panel patterns
-        metabolic_patterns = {
-            'glucose': r'(?:Glucose|Blood Sugar)[:\s]*(\d+\.?\d*)',
-            'sodium': r'(?:Na|Sodium)[:\s]*(\d+\.?\d*)',
-            'potassium': r'(?:K|Potassium)[:\s]*(\d+\.?\d*)',
-            'chloride': r'(?:Cl|Chloride)[:\s]*(\d+\.?\d*)',
-            'creatinine': r'(?:Creatinine|Cr)[:\s]*(\d+\.?\d*)',
-            'bun': r'(?:BUN|Blood Urea Nitrogen)[:\s]*(\d+\.?\d*)'
-        }
-        
-        # Lipid panel patterns
-        lipid_patterns = {
-            'total_cholesterol': r'(?:Total Cholesterol|Cholesterol)[:\s]*(\d+\.?\d*)',
-            'hdl': r'(?:HDL|HDL Cholesterol)[:\s]*(\d+\.?\d*)',
-            'ldl': r'(?:LDL|LDL Cholesterol)[:\s]*(\d+\.?\d*)',
-            'triglycerides': r'(?:Triglycerides|TG)[:\s]*(\d+\.?\d*)'
-        }
-        
-        # Extract CBC values
-        for test, pattern in cbc_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    lab_results['cbc'][test] = float(match.group(1))
-                except ValueError:
-                    lab_results['cbc'][test] = match.group(1)
-        
-        # Extract metabolic panel values
-        for test, pattern in metabolic_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    lab_results['metabolic'][test] = float(match.group(1))
-                except ValueError:
-                    lab_results['metabolic'][test] = match.group(1)
-        
-        # Extract lipid panel values
-        for test, pattern in lipid_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    lab_results['lipid'][test] = float(match.group(1))
-                except ValueError:
-                    lab_results['lipid'][test] = match.group(1)
+        # Extract CBC, metabolic panel and lipid panel values
+        for panel, patterns in LAB_PATTERNS.items():
+            for test, pattern in patterns.items():
+                match = pattern.search(text)
+                if match:
+                    try:
+                        lab_results[panel][test] = float(match.group(1))
+                    except ValueError:
+                        lab_results[panel][test] = match.group(1)
         
         return lab_results
     
@@ -244,8 +245,7 @@ class MedicalReportProcessor:
         diagnoses = []
         
         # Look for diagnosis sections
-        dx_section_pattern = r'(?:Diagnos[ie]s?|Impression|Assessment)[:\s]*(.*?)(?:\n\n|\Z)'
-        dx_section_match = re.search(dx_section_pattern, text, re.IGNORECASE | re.DOTALL)
+        dx_section_match = DX_SECTION_PATTERN.search(text)
         
         if dx_section_match:
             dx_text = dx_section_match.group(1)
@@ -258,13 +258,13 @@ class MedicalReportProcessor:
                     continue
                 
                 # Look for ICD codes
-                icd_match = re.search(self.icd_pattern, line)
+                icd_match = self.icd_pattern.search(line)
                 code = icd_match.group(1) if icd_match else None
                 
                 # Extract description (remove numbering, ICD codes)
-                description = re.sub(r'^\d+\.?\s*', '', line)
-                description = re.sub(self.icd_pattern, '', description).strip()
-                description = re.sub(r'[(\[].*?[)\]]', '', description).strip()
+                description = LIST_NUMBER_PATTERN.sub('', line)
+                description = self.icd_pattern.sub('', description).strip()
+                description = BRACKETED_PATTERN.sub('', description).strip()
                 
                 if description:
                     diagnoses.append({
@@ -287,8 +287,7 @@ class MedicalReportProcessor:
         allergies = []
         
         # Look for allergy sections
-        allergy_section_pattern = r'(?:Allergies?|Adverse Reactions?)[:\s]*(.*?)(?:\n\n|\Z)'
-        allergy_section_match = re.search(allergy_section_pattern, text, re.IGNORECASE | re.DOTALL)
+        allergy_section_match = ALLERGY_SECTION_PATTERN.search(text)
         
         if allergy_section_match:
             allergy_text = allergy_section_match.group(1)
@@ -301,20 +300,18 @@ class MedicalReportProcessor:
                     continue
                 
                 # Remove numbering
-                line = re.sub(r'^\d+\.?\s*', '', line)
+                line = LIST_NUMBER_PATTERN.sub('', line)
                 
                 allergy = {'allergen': line}
                 
                 # Try to extract reaction
                 if '-' in line or ':' in line:
-                    parts = re.split(r'[-:]', line, maxsplit=1)
-                    if len(parts) == 2:
-                        allergy['allergen'] = parts[0].strip()
-                        allergy['reaction'] = parts[1].strip()
+                    cut = line.translate(REACTION_SEPARATOR_TABLE).index('-')
+                    allergy['allergen'] = line[:cut].strip()
+                    allergy['reaction'] = line[cut + 1:].strip()
                 
                 # Try to extract severity
-                severity_pattern = r'\b(mild|moderate|severe)\b'
-                severity_match = re.search(severity_pattern, line, re.IGNORECASE)
+                severity_match = SEVERITY_PATTERN.search(line)
                 if severity_match:
                     allergy['severity'] = severity_match.group(1).capitalize()
                 
@@ -11,7 +11,6 @@ from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import numpy as np
 from datetime import datetime
-import re
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +70,8 @@ class VectorKnowledgeBase:
         self.index = None
         self.documents = []  # Store document chunks with metadata
         self.document_count = 0
+        # document_id -> positions of its chunks in self.documents / the index
+        self._chunk_positions: Dict[Any, List[int]] = {}
         
         # Load existing index if available
         self._load_index()
@@ -88,6 +89,7 @@ class VectorKnowledgeBase:
                     data = pickle.load(f)
                     self.documents = data.get('documents', [])
                     self.document_count = data.get('document_count', 0)
+                self._index_chunk_positions()
                 
                 logger.info(f"Loaded existing index with {len(self.documents)} chunks")
             except Exception as e:
@@ -104,6 +106,14 @@ class VectorKnowledgeBase:
             self.index = faiss.IndexFlatL2(self.embedding_dimension)
         self.documents = []
         self.document_count = 0
+        self._chunk_positions = {}
+    
+    def _index_chunk_positions(self, start: int = 0):
+        """Record the positions of chunks from `start` on (rebuilds the map when 0)"""
+        if start == 0:
+            self._chunk_positions = {}
+        for position in range(start, len(self.documents)):
+            self._chunk_positions.setdefault(self.documents[position].get('document_id'), []).append(position)
     
     def _save_index(self):
         """Save FAISS index and metadata to disk"""
@@ -234,7 +244,9 @@ class VectorKnowledgeBase:
         if embeddings_batch:
             embeddings_array = np.array(embeddings_batch, dtype='float32')
             self.index.add(embeddings_array)
+            start = len(self.documents)
             self.documents.extend(documents_batch)
+            self._index_chunk_positions(start)
             self.document_count += 1
             
             # Save index
@@ -294,7 +306,9 @@ class VectorKnowledgeBase:
         if embeddings_batch:
             embeddings_array = np.array(embeddings_batch, dtype='float32')
             self.index.add(embeddings_array)
+            start = len(self.documents)
             self.documents.extend(documents_batch)
+            self._index_chunk_positions(start)
             self.document_count += 1
             
             # Save index
@@ -366,20 +380,16 @@ class VectorKnowledgeBase:
             logger.warning("FAISS/OpenAI not available - using keyword fallback search")
             results = []
             q = query.lower()
+            tokens = q.split()
             for doc in self.documents:
                 text = (doc.get('chunk_text') or '').lower()
                 if not text:
                     continue
-                score = 0
-                # simple scoring: count occurrences
-                occurrences = len(re.findall(re.escape(q), text))
-                if occurrences > 0:
-                    score = occurrences
-                else:
+                # simple scoring: count occurrences (one C-level scan)
+                score = text.count(q)
+                if not score:
                     # partial match on words
-                    for token in q.split():
-                        if token and token in text:
-                            score += 0.5
+                    score = 0.5 * sum(token in text for token in tokens)
                 if score > 0:
                     results.append({
                         'content': doc.get('chunk_text', ''),
@@ -450,33 +460,34 @@ class VectorKnowledgeBase:
             Number of chunks deleted
         """
         # Find chunks to delete
-        indices_to_keep = []
-        documents_to_keep = []
-        deleted_count = 0
-        
-        for i, doc in enumerate(self.documents):
-            if doc.get('document_id') == document_id:
-                deleted_count += 1
-            else:
-                indices_to_keep.append(i)
-                documents_to_keep.append(doc)
-        
-        if deleted_count > 0:
-            # Rebuild index (FAISS doesn't support deletion)
+        positions = self._chunk_positions.get(document_id)
+        if not positions:
+            return 0
+        
+        deleted_count = len(positions)
+        deleted = set(positions)
+        documents_to_keep = [doc for i, doc in enumerate(self.documents) if i not in deleted]
+        
+        if FAISS_AVAILABLE and self.index is not None and self.index.ntotal == len(self.documents):
+            # Flat index removal keeps the order of the remaining vectors
+            self.index.remove_ids(np.array(positions, dtype='int64'))
+        else:
+            # Rebuild index from re-embedded chunks
             self._initialize_new_index()
             
-            if FAISS_AVAILABLE and self.openai_client and indices_to_keep:
+            if FAISS_AVAILABLE and self.openai_client and documents_to_keep:
                 # Re-embed remaining documents
                 for doc in documents_to_keep:
                     embedding = self._get_embedding(doc['chunk_text'])
                     if embedding is not None:
                         self.index.add(np.array([embedding], dtype='float32'))
-                
-            self.documents = documents_to_keep
-            self.document_count -= 1
-            self._save_index()
-            
-            logger.info(f"Deleted {deleted_count} chunks for document {document_id}")
+        
+        self.documents = documents_to_keep
+        self._index_chunk_positions()
+        self.document_count -= 1
+        self._save_index()
+        
+        logger.info(f"Deleted {deleted_count} chunks for document {document_id}")
         
         return deleted_count
     
@@ -3,14 +3,46 @@ Medical Visual Content Service
 Fetches relevant medical images and videos from trusted online sources
 """
 
+import functools
 import logging
 import re
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, FrozenSet, Tuple
 from urllib.parse import quote_plus
 
 logger = logging.getLogger(__name__)
 
 
+# Search-term tokens that add the optional CDC / Khan Academy links
+# (whole tokens, so plural forms are listed explicitly)
+_CDC_TRIGGERS = frozenset({
+    'infection', 'infections', 'disease', 'diseases',
+    'vaccine', 'vaccines', 'outbreak', 'outbreaks',
+})
+_KHAN_TRIGGERS = frozenset({
+    'anatomy', 'physiology', 'body', 'bodies',
+    'system', 'systems', 'organ', 'organs',
+})
+
+
+@dataclass(slots=True, frozen=True)
+class VisualResource:
+    """A single image/video link suggested alongside a chat response"""
+    source: str
+    title: str
+    url: str
+    icon: str
+    description: str
+    type: str
+    channel: Optional[str] = None
+
+
+@functools.lru_cache(maxsize=1024)
+def _qp(s: str) -> str:
+    """Memoized quote_plus - search terms repeat heavily across chat requests"""
+    return quote_plus(s)
+
+
 class MedicalVisualContentService:
     """Service to find relevant medical images and videos"""
     
@@ -32,7 +64,7 @@ class MedicalVisualContentService:
             'khan_academy': 'https://www.khanacademy.org/search?page_search_query='
         }
     
-    def get_visual_resources(self, query: str, medical_condition: Optional[str] = None) -> Dict[str, List[Dict[str, str]]]:
+    def get_visual_resources(self, query: str, medical_condition: Optional[str] = None) -> Dict[str, Any]:
         """
         Get relevant medical images and videos for a query
         
@@ -45,10 +77,15 @@ class MedicalVisualContentService:
         """
         try:
             # Extract medical terms from query
-            search_term = self._extract_medical_terms(query, medical_condition)
+            search_term, tokens = self._extract_medical_terms(query, medical_condition)
             
-            images = self._generate_image_links(search_term, query)
-            videos = self._generate_video_links(search_term, query)
+            # Encode once and share between both generators
+            encoded_term = _qp(search_term)
+            encoded_anatomy = _qp(f"{search_term} medical anatomy")
+            encoded_education = _qp(f"{search_term} medical education")
+            
+            images = self._generate_image_links(search_term, query, encoded_term, encoded_anatomy, tokens)
+            videos = self._generate_video_links(search_term, query, encoded_term, encoded_education, tokens)
             
             return {
                 'images': images,
@@ -59,20 +96,27 @@ class MedicalVisualContentService:
             logger.error(f"Error getting visual resources: {e}")
             return {'images': [], 'videos': [], 'search_term': query}
     
-    def _extract_medical_terms(self, query: str, medical_condition: Optional[str] = None) -> str:
-        """Extract the most relevant medical term from query"""
+    def _extract_medical_terms(self, query: str, medical_condition: Optional[str] = None) -> Tuple[str, FrozenSet[str]]:
+        """
+        Extract the most relevant medical term from query
+        
+        Returns:
+            Tuple of (search term, lowercase tokens of the search term) so the
+            link generators don't need to re-lowercase and re-split it
+        """
         if medical_condition:
             # Clean up medical condition - remove database references
-            import re
+            term = medical_condition
             # Extract condition name from patterns like "Medical Database - Gastroenteritis (Stomach Flu)"
             condition_match = re.search(r'(?:Medical Database|Local Database)\s*-\s*(.+?)(?:\s*\(|$)', medical_condition)
             if condition_match:
-                return condition_match.group(1).strip()
-            # Extract from patterns like "**Pneumonia** (ICD-10: J18)"
-            condition_match = re.search(r'\*\*([^*]+)\*\*', medical_condition)
-            if condition_match:
-                return condition_match.group(1).strip()
-            return medical_condition
+                term = condition_match.group(1).strip()
+            else:
+                # Extract from patterns like "**Pneumonia** (ICD-10: J18)"
+                condition_match = re.search(r'\*\*([^*]+)\*\*', medical_condition)
+                if condition_match:
+                    term = condition_match.group(1).strip()
+            return term, frozenset(term.lower().split())
         
         # Common medical keywords to prioritize (including symptoms)
         medical_keywords = [
@@ -86,149 +130,158 @@ class MedicalVisualContentService:
         ]
         
         query_lower = query.lower()
+        words = query_lower.split()
         
         # Find matching medical terms
         for keyword in medical_keywords:
             if keyword in query_lower:
                 # Return the keyword and surrounding context
-                words = query_lower.split()
                 if keyword in words:
                     idx = words.index(keyword)
                     # Get keyword and one word before/after if available
-                    context = []
-                    if idx > 0:
-                        context.append(words[idx-1])
-                    context.append(keyword)
-                    if idx < len(words) - 1:
-                        context.append(words[idx+1])
-                    return ' '.join(context)
-                return keyword
+                    context = words[max(idx - 1, 0):idx + 2]
+                    return ' '.join(context), frozenset(context)
+                return keyword, frozenset(keyword.split())
         
         # If no specific keyword, return first few words
-        words = query.split()[:3]
-        return ' '.join(words)
+        head = query.split()[:3]
+        return ' '.join(head), frozenset(words[:3])
     
-    def _generate_image_links(self, search_term: str, original_query: str) -> List[Dict[str, str]]:
+    def _generate_image_links(self, search_term: str, original_query: str,
+                              encoded_term: Optional[str] = None,
+                              encoded_medical: Optional[str] = None,
+                              tokens: Optional[FrozenSet[str]] = None) -> List[VisualResource]:
         """Generate image search links from trusted medical sources"""
         images = []
-        encoded_term = quote_plus(search_term)
-        encoded_medical = quote_plus(f"{search_term} medical anatomy")
+        if encoded_term is None:
+            encoded_term = _qp(search_term)
+        if encoded_medical is None:
+            encoded_medical = _qp(f"{search_term} medical anatomy")
+        if tokens is None:
+            tokens = frozenset(search_term.lower().split())
         
         # MedlinePlus Images
-        images.append({
-            'source': 'MedlinePlus',
-            'title': f'{search_term.title()} - Medical Images',
-            'url': f'https://medlineplus.gov/ency/imagepages.htm',
-            'icon': '[MEDICAL]',
-            'description': 'Trusted medical encyclopedia with anatomical illustrations',
-            'type': 'image_gallery'
-        })
+        images.append(VisualResource(
+            source='MedlinePlus',
+            title=f'{search_term.title()} - Medical Images',
+            url=f'https://medlineplus.gov/ency/imagepages.htm',
+            icon='[MEDICAL]',
+            description='Trusted medical encyclopedia with anatomical illustrations',
+            type='image_gallery'
+        ))
         
         # Google Images (Medical Sites Only)
-        images.append({
-            'source': 'Medical Image Search',
-            'title': f'{search_term.title()} - Medical Diagrams',
-            'url': f'https://www.google.com/search?q={encoded_medical}&tbm=isch&tbs=sur:f',
-            'icon': '[RESEARCH]',
-            'description': 'Medical diagrams and anatomical images',
-            'type': 'image_search'
-        })
+        images.append(VisualResource(
+            source='Medical Image Search',
+            title=f'{search_term.title()} - Medical Diagrams',
+            url=f'https://www.google.com/search?q={encoded_medical}&tbm=isch&tbs=sur:f',
+            icon='[RESEARCH]',
+            description='Medical diagrams and anatomical images',
+            type='image_search'
+        ))
         
         # Wikimedia Commons (Medical)
-        images.append({
-            'source': 'Wikimedia Medical',
-            'title': f'{search_term.title()} - Educational Images',
-            'url': f'https://commons.wikimedia.org/w/index.php?search={encoded_term}+medical&title=Special:MediaSearch&type=image',
-            'icon': '[BOOK]',
-            'description': 'Free medical and anatomical images',
-            'type': 'image_gallery'
-        })
+        images.append(VisualResource(
+            source='Wikimedia Medical',
+            title=f'{search_term.title()} - Educational Images',
+            url=f'https://commons.wikimedia.org/w/index.php?search={encoded_term}+medical&title=Special:MediaSearch&type=image',
+            icon='[BOOK]',
+            description='Free medical and anatomical images',
+            type='image_gallery'
+        ))
         
         # CDC Images (if relevant)
-        if any(term in search_term.lower() for term in ['infection', 'disease', 'vaccine', 'outbreak']):
-            images.append({
-                'source': 'CDC',
-                'title': f'{search_term.title()} - Public Health Images',
-                'url': f'https://www.cdc.gov/search.htm?query={encoded_term}',
-                'icon': '[PUBLIC_HEALTH]',
-                'description': 'Public health and disease information',
-                'type': 'resource_page'
-            })
+        if tokens & _CDC_TRIGGERS:
+            images.append(VisualResource(
+                source='CDC',
+                title=f'{search_term.title()} - Public Health Images',
+                url=f'https://www.cdc.gov/search.htm?query={encoded_term}',
+                icon='[PUBLIC_HEALTH]',
+                description='Public health and disease information',
+                type='resource_page'
+            ))
         
         return images
     
-    def _generate_video_links(self, search_term: str, original_query: str) -> List[Dict[str, str]]:
+    def _generate_video_links(self, search_term: str, original_query: str,
+                              encoded_term: Optional[str] = None,
+                              encoded_medical: Optional[str] = None,
+                              tokens: Optional[FrozenSet[str]] = None) -> List[VisualResource]:
         """Generate educational video links from trusted sources"""
         videos = []
-        encoded_term = quote_plus(search_term)
-        encoded_medical = quote_plus(f"{search_term} medical education")
+        if encoded_term is None:
+            encoded_term = _qp(search_term)
+        if encoded_medical is None:
+            encoded_medical = _qp(f"{search_term} medical education")
+        if tokens is None:
+            tokens = frozenset(search_term.lower().split())
         
         # Osmosis - High-quality medical videos
-        videos.append({
-            'source': 'Osmosis',
-            'title': f'{search_term.title()} - Medical Video',
-            'url': f'https://www.osmosis.org/search?q={encoded_term}',
-            'icon': '[EDUCATION]',
-            'description': 'Medical education videos for healthcare professionals',
-            'type': 'educational_video',
-            'channel': 'Osmosis Medical Education'
-        })
+        videos.append(VisualResource(
+            source='Osmosis',
+            title=f'{search_term.title()} - Medical Video',
+            url=f'https://www.osmosis.org/search?q={encoded_term}',
+            icon='[EDUCATION]',
+            description='Medical education videos for healthcare professionals',
+            type='educational_video',
+            channel='Osmosis Medical Education'
+        ))
         
         # YouTube - Medical channels
-        videos.append({
-            'source': 'YouTube Medical',
-            'title': f'{search_term.title()} - Educational Videos',
-            'url': f'https://www.youtube.com/results?search_query={encoded_medical}',
-            'icon': '[VIDEO]',
-            'description': 'Medical education videos from trusted channels',
-            'type': 'video_search',
-            'channel': 'Various Medical Educators'
-        })
+        videos.append(VisualResource(
+            source='YouTube Medical',
+            title=f'{search_term.title()} - Educational Videos',
+            url=f'https://www.youtube.com/results?search_query={encoded_medical}',
+            icon='[VIDEO]',
+            description='Medical education videos from trusted channels',
+            type='video_search',
+            channel='Various Medical Educators'
+        ))
         
         # MedlinePlus Videos
-        videos.append({
-            'source': 'MedlinePlus Videos',
-            'title': f'{search_term.title()} - Patient Education',
-            'url': f'https://medlineplus.gov/videos/',
-            'icon': '[PATIENT_ED]',
-            'description': 'Patient education videos from NIH',
-            'type': 'patient_education',
-            'channel': 'MedlinePlus (NIH)'
-        })
+        videos.append(VisualResource(
+            source='MedlinePlus Videos',
+            title=f'{search_term.title()} - Patient Education',
+            url=f'https://medlineplus.gov/videos/',
+            icon='[PATIENT_ED]',
+            description='Patient education videos from NIH',
+            type='patient_education',
+            channel='MedlinePlus (NIH)'
+        ))
         
         # Khan Academy (if anatomy/physiology related)
-        if any(term in search_term.lower() for term in ['anatomy', 'physiology', 'body', 'system', 'organ']):
-            videos.append({
-                'source': 'Khan Academy',
-                'title': f'{search_term.title()} - Anatomy & Physiology',
-                'url': f'https://www.khanacademy.org/search?page_search_query={encoded_term}',
-                'icon': '[ANATOMY]',
-                'description': 'Anatomy and physiology educational videos',
-                'type': 'educational_video',
-                'channel': 'Khan Academy Medicine'
-            })
+        if tokens & _KHAN_TRIGGERS:
+            videos.append(VisualResource(
+                source='Khan Academy',
+                title=f'{search_term.title()} - Anatomy & Physiology',
+                url=f'https://www.khanacademy.org/search?page_search_query={encoded_term}',
+                icon='[ANATOMY]',
+                description='Anatomy and physiology educational videos',
+                type='educational_video',
+                channel='Khan Academy Medicine'
+            ))
         
         # Armando Hasudungan (Medical illustrations)
-        videos.append({
-            'source': 'Medical Illustrations',
-            'title': f'{search_term.title()} - Animated Explanation',
-            'url': f'https://www.youtube.com/results?search_query=armando+hasudungan+{encoded_term}',
-            'icon': '[ILLUSTRATION]',
-            'description': 'Hand-drawn medical illustrations and animations',
-            'type': 'educational_video',
-            'channel': 'Armando Hasudungan'
-        })
+        videos.append(VisualResource(
+            source='Medical Illustrations',
+            title=f'{search_term.title()} - Animated Explanation',
+            url=f'https://www.youtube.com/results?search_query=armando+hasudungan+{encoded_term}',
+            icon='[ILLUSTRATION]',
+            description='Hand-drawn medical illustrations and animations',
+            type='educational_video',
+            channel='Armando Hasudungan'
+        ))
         
         # Ninja Nerd (Detailed medical lectures)
-        videos.append({
-            'source': 'Ninja Nerd',
-            'title': f'{search_term.title()} - Detailed Lecture',
-            'url': f'https://www.youtube.com/results?search_query=ninja+nerd+{encoded_term}',
-            'icon': '[LECTURE]',
-            'description': 'In-depth medical lectures with visual aids',
-            'type': 'educational_video',
-            'channel': 'Ninja Nerd'
-        })
+        videos.append(VisualResource(
+            source='Ninja Nerd',
+            title=f'{search_term.title()} - Detailed Lecture',
+            url=f'https://www.youtube.com/results?search_query=ninja+nerd+{encoded_term}',
+            icon='[LECTURE]',
+            description='In-depth medical lectures with visual aids',
+            type='educational_video',
+            channel='Ninja Nerd'
+        ))
         
         return videos
     
@@ -244,17 +297,17 @@ class MedicalVisualContentService:
         if resources.get('images'):
             markdown += "### [IMAGE] Medical Images & Diagrams\n\n"
             for img in resources['images']:
-                markdown += f"**{img['icon']} [{img['source']}]({img['url']})** - {img['title']}\n"
-                markdown += f"   _{img['description']}_\n\n"
+                markdown += f"**{img.icon} [{img.source}]({img.url})** - {img.title}\n"
+                markdown += f"   _{img.description}_\n\n"
         
         # Add videos section
         if resources.get('videos'):
             markdown += "### [CINEMA] Educational Videos\n\n"
             for video in resources['videos']:
-                markdown += f"**{video['icon']} [{video['source']}]({video['url']})** - {video['title']}\n"
-                markdown += f"   _{video['description']}_"
-                if video.get('channel'):
-                    markdown += f" | Channel: {video['channel']}"
+                markdown += f"**{video.icon} [{video.source}]({video.url})** - {video.title}\n"
+                markdown += f"   _{video.description}_"
+                if video.channel:
+                    markdown += f" | Channel: {video.channel}"
                 markdown += "\n\n"
         
         markdown += "---\n\n"
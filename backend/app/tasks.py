@@ -9,6 +9,19 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Default topics for scheduled KB updates (joined form cached for logging)
+_DEFAULT_KB_TOPICS = (
+    "diabetes mellitus",
+    "hypertension",
+    "heart disease",
+    "cancer",
+    "pneumonia",
+    "COVID-19",
+    "depression",
+    "arthritis",
+)
+_DEFAULT_KB_TOPICS_STR = ", ".join(_DEFAULT_KB_TOPICS)
+
 # Import Celery app
 try:
     from app.celery_config import get_celery_app
@@ -44,19 +57,13 @@ def update_knowledge_base(
     try:
         # Default topics if none provided
         if topics is None:
-            topics = [
-                "diabetes mellitus",
-                "hypertension",
-                "heart disease",
-                "cancer",
-                "pneumonia",
-                "COVID-19",
-                "depression",
-                "arthritis"
-            ]
+            topics = list(_DEFAULT_KB_TOPICS)
+            topics_str = _DEFAULT_KB_TOPICS_STR
+        else:
+            topics_str = ', '.join(topics)
         
         logger.info(f"[TASK-KB-UPDATE] Starting KB update for {len(topics)} topics")
-        logger.info(f"[TASK-KB-UPDATE] Topics: {', '.join(topics)}")
+        logger.info(f"[TASK-KB-UPDATE] Topics: {topics_str}")
         
         # Import services
         from app.services.pubmed_integration import get_pubmed_integration
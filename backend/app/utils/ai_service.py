@@ -1,9 +1,16 @@
 """OpenAI integration for AI-powered responses with robust error handling."""
 
 import os
+import json
+import asyncio
+import string
+import time
+import hashlib
 import logging
-from typing import List, Dict
-from openai import OpenAI, APITimeoutError, RateLimitError, APIError
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, AsyncIterator, List, Dict, Optional, Set, Tuple
+import httpx
+from openai import AsyncOpenAI, APITimeoutError, RateLimitError, APIError
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -13,21 +20,308 @@ backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 env_path = os.path.join(backend_dir, '.env')
 load_dotenv(env_path)
 
+# HTTP/2 multiplexing needs the optional h2 package; fall back to HTTP/1.1 pooling
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Initialize OpenAI client with timeout and error handling
 api_key = os.getenv("OPENAI_API_KEY")
 client = None
+http_client = None
+
 
-if not api_key or api_key.startswith("sk-your"):
-    logger.warning("[WARNING] OpenAI API key not configured properly - AI features will be limited")
-else:
+def init_ai_client() -> Optional[httpx.AsyncClient]:
+    """
+    Create the process-wide AsyncOpenAI client if it doesn't exist yet.
+    
+    All OpenAI calls share one pooled httpx.AsyncClient so keep-alive
+    connections (and HTTP/2 streams when available) are reused instead of
+    paying a TLS handshake per request.
+    
+    Returns:
+        The shared httpx client, or None when the API key isn't configured
+    """
+    global client, http_client
+    if client is not None:
+        return http_client
+    
+    if not api_key or api_key.startswith("sk-your"):
+        logger.warning("[WARNING] OpenAI API key not configured properly - AI features will be limited")
+        return None
+    
     try:
-        client = OpenAI(api_key=api_key, timeout=30.0, max_retries=2)
-        logger.info("[OK] OpenAI client initialized successfully")
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            http2=HTTP2_AVAILABLE,
+            timeout=30.0,
+        )
+        client = AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=30.0, max_retries=2)
+        logger.info(f"[OK] OpenAI client initialized successfully (http2={HTTP2_AVAILABLE})")
     except Exception as e:
         logger.error(f"[ERROR] Failed to initialize OpenAI client: {e}")
+        client = None
+        http_client = None
+    return http_client
+
+
+async def close_ai_client() -> None:
+    """Close the pooled OpenAI HTTP client (called from the app lifespan)."""
+    global client, http_client
+    if client is not None:
+        await client.close()
+    elif http_client is not None:
+        await http_client.aclose()
+    client = None
+    http_client = None
+
+
+init_ai_client()
 
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
+# In-process TTL cache for discharge/diagnosis generation.
+# Re-renders and retries of the same case return the cached text instead of
+# paying full OpenAI latency again.
+RESPONSE_CACHE_MAXSIZE = 1024
+RESPONSE_CACHE_TTL = 900  # seconds
+_response_cache: "OrderedDict[Tuple[str, bytes], Tuple[float, str]]" = OrderedDict()
+
+
+def _cache_key(kind: str, payload: Any) -> Tuple[str, bytes]:
+    """Hash normalized input so equal cases map to the same entry."""
+    raw = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return kind, hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _cache_get(key: Tuple[str, bytes]) -> Optional[str]:
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _response_cache.pop(key, None)
+        return None
+    _response_cache.move_to_end(key)
+    return value
+
+
+def _cache_set(key: Tuple[str, bytes], value: str) -> None:
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, value)
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_MAXSIZE:
+        _response_cache.popitem(last=False)
+
+
+# Prompt templates are parsed once at import; only the field fill happens per call
+_DISCHARGE_SYSTEM_PROMPT = """You are an expert medical physician assistant specializing in creating comprehensive discharge summaries. 
+    Provide detailed, professional medical documentation following standard medical practices. 
+    Include appropriate medical terminology, proper formatting, and evidence-based recommendations."""
+
+_DIAGNOSIS_SYSTEM_PROMPT = """You are an expert diagnostic assistant physician. Provide differential diagnoses based on symptoms and patient history.
+    Always include: 1) Most likely diagnoses, 2) Red flags/concerning features, 3) Recommended investigations.
+    Emphasize that this is for clinical decision support and not a replacement for clinical judgment."""
+
+_DIAGNOSIS_PROMPT_TEMPLATE = string.Template("""
+Patient presents with the following:
+
+SYMPTOMS: $symptoms
+
+PATIENT HISTORY: $patient_history
+
+Please provide:
+1. Differential Diagnoses (in order of likelihood)
+2. Key Clinical Features supporting each diagnosis
+3. Red Flags or concerning features
+4. Recommended Investigations
+5. Initial Management Considerations
+""")
+
+_DISCHARGE_PROMPT_TEMPLATE = string.Template("""
+Based on the following patient information, generate a comprehensive discharge summary:
+
+PATIENT INFORMATION:
+- Name: $patient_name
+- Age: $patient_age
+- Gender: $patient_gender
+- MRN: $mrn
+- Admission Date: $admission_date
+- Discharge Date: $discharge_date
+
+CLINICAL DETAILS:
+- Chief Complaint: $chief_complaint
+- History of Present Illness: $history_present_illness
+- Past Medical History: $past_medical_history
+- Physical Examination: $physical_examination
+- Diagnosis: $diagnosis
+- Hospital Course: $hospital_course
+- Procedures: $procedures_performed
+- Medications During Stay: $medications
+
+Please generate:
+1. HOSPITAL COURSE SUMMARY: Concise narrative of the hospitalization
+2. DISCHARGE MEDICATIONS: Complete list with dosages, frequency, and duration
+3. FOLLOW-UP INSTRUCTIONS: Specific appointments and monitoring needed
+4. DIET: Detailed dietary recommendations and restrictions
+5. ACTIVITY: Activity level and restrictions
+6. WARNING SIGNS: Red flags requiring immediate medical attention
+7. PATIENT EDUCATION: Key points patient should understand
+
+Format professionally as a complete discharge summary.
+""")
+
+
+# Client-side rate limiting. Limits come from the account tier (0 disables the
+# local budget); the x-ratelimit-* response headers are always honoured so we
+# pause before the API starts returning 429s.
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "0"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "0"))
+_RESET_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_reset(value: Optional[str]) -> float:
+    """Parse OpenAI reset durations such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return 0.0
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else ch
+        total += float(number or 0) * _RESET_UNITS.get(unit, 0.0)
+        number = ""
+        i += len(unit)
+    return total
+
+
+def _estimate_tokens(formatted_messages: List[Dict[str, str]], max_tokens: int, n: int = 1) -> int:
+    """Rough request cost (~4 chars per token) plus the completion budget."""
+    prompt_chars = sum(len(m.get("content") or "") for m in formatted_messages)
+    return prompt_chars // 4 + max_tokens * n
+
+
+class _RateLimiter:
+    """Sliding-window RPM/TPM budget shared by all OpenAI chat calls."""
+    
+    def __init__(self, rpm: int, tpm: int, window: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events: deque = deque()  # (monotonic time, tokens)
+        self._tokens_in_window = 0
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def acquire(self, tokens: int) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._paused_until > now:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                
+                while self._events and self._events[0][0] <= now - self.window:
+                    self._tokens_in_window -= self._events.popleft()[1]
+                
+                requests_ok = self.rpm <= 0 or len(self._events) < self.rpm
+                tokens_ok = self.tpm <= 0 or not self._events or self._tokens_in_window + tokens <= self.tpm
+                if requests_ok and tokens_ok:
+                    if self.rpm > 0 or self.tpm > 0:
+                        self._events.append((now, tokens))
+                        self._tokens_in_window += tokens
+                    return
+                
+                wait = self._events[0][0] + self.window - now
+                logger.info(f"OpenAI client-side rate limit reached - waiting {wait:.2f}s")
+                await asyncio.sleep(max(wait, 0.01))
+    
+    def update_from_headers(self, headers) -> None:
+        """Pause new calls until reset when the API reports an exhausted budget."""
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                exhausted = int(remaining) <= 0
+            except ValueError:
+                continue
+            if exhausted:
+                reset = _parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                self._paused_until = max(self._paused_until, time.monotonic() + reset)
+                logger.warning(f"OpenAI {kind} budget exhausted - pausing calls for {reset:.2f}s")
+
+
+_rate_limiter = _RateLimiter(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT)
+
+
+async def _request_completions(
+    formatted_messages: List[Dict[str, str]],
+    max_tokens: int,
+    temperature: float,
+    n: int = 1,
+) -> List[str]:
+    """Issue one chat completion call and return the content of every choice."""
+    await _rate_limiter.acquire(_estimate_tokens(formatted_messages, max_tokens, n))
+    logger.debug(f"Calling OpenAI {MODEL} with {len(formatted_messages)} messages (n={n})")
+    raw_response = await client.chat.completions.with_raw_response.create(
+        model=MODEL,
+        messages=formatted_messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        n=n,
+    )
+    _rate_limiter.update_from_headers(raw_response.headers)
+    response = raw_response.parse()
+    choices = sorted(response.choices, key=lambda choice: choice.index)
+    return [choice.message.content for choice in choices]
+
+
+def _friendly_error(e: Exception) -> Exception:
+    """Map OpenAI/client failures to actionable, user-facing exceptions."""
+    if isinstance(e, APITimeoutError):
+        logger.error(f"OpenAI API timeout after 30s: {e}")
+        return Exception("OpenAI timeout (30s). Please try with a shorter query or use knowledge base search.")
+    
+    if isinstance(e, RateLimitError):
+        logger.error(f"OpenAI rate limit exceeded: {e}")
+        return Exception("OpenAI rate limit exceeded. Please wait a few seconds and try again, or use knowledge base.")
+    
+    if isinstance(e, APIError):
+        error_msg = str(e)
+        logger.error(f"OpenAI API Error: {error_msg}")
+        
+        # Provide specific, actionable error messages
+        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower() or "401" in error_msg:
+            return Exception("OpenAI API key invalid. Please check OPENAI_API_KEY in backend/.env file.")
+        elif "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
+            return Exception("OpenAI quota exceeded. Please add credits at https://platform.openai.com/account/billing")
+        elif "model" in error_msg.lower():
+            return Exception(f"Model '{MODEL}' not available. Try setting OPENAI_MODEL=gpt-4o-mini in backend/.env")
+        else:
+            return Exception(f"OpenAI API error: {error_msg[:150]}. Using knowledge base fallback.")
+    
+    error_msg = str(e)
+    logger.error(f"Unexpected error in AI service: {error_msg}", exc_info=e)
+    # Re-raise if already a user-friendly exception
+    if "OpenAI" in error_msg or "API" in error_msg or "quota" in error_msg:
+        return e
+    # Otherwise, create generic error with fallback suggestion
+    return Exception(f"AI service error: {error_msg[:100]}. Please try knowledge base search.")
+
+
+def _require_client() -> None:
+    if not client:
+        logger.error("OpenAI client not initialized")
+        raise Exception("OpenAI API not configured. Please set OPENAI_API_KEY in backend/.env file. Visit: https://platform.openai.com/api-keys")
+
 
 async def generate_ai_response(
     messages: List[Dict[str, str]],
@@ -48,9 +342,7 @@ async def generate_ai_response(
         AI generated response text
     """
     # Check if client is available
-    if not client:
-        logger.error("OpenAI client not initialized")
-        raise Exception("OpenAI API not configured. Please set OPENAI_API_KEY in backend/.env file. Visit: https://platform.openai.com/api-keys")
+    _require_client()
     
     try:
         # Prepare messages with system prompt
@@ -58,48 +350,164 @@ async def generate_ai_response(
         formatted_messages.extend(messages)
         
         # Call OpenAI API with timeout and retry
-        logger.debug(f"Calling OpenAI {MODEL} with {len(messages)} messages")
-        response = client.chat.completions.create(
+        result = (await _request_completions(formatted_messages, max_tokens, temperature))[0]
+        logger.debug(f"OpenAI response received ({len(result)} chars)")
+        return result
+    
+    except Exception as e:
+        raise _friendly_error(e)
+
+
+def is_ai_available() -> bool:
+    """Whether an OpenAI client is configured for this process."""
+    return client is not None
+
+
+async def stream_ai_response(
+    messages: List[Dict[str, str]],
+    system_prompt: str = "You are a helpful medical AI assistant. Provide accurate, professional medical information.",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+) -> AsyncIterator[str]:
+    """
+    Stream an AI response token-by-token as the completion is generated.
+    
+    Args:
+        messages: List of conversation messages with role and content
+        system_prompt: System prompt to set AI behavior
+        max_tokens: Maximum tokens in response
+        temperature: Response randomness (0-2)
+        
+    Yields:
+        Text deltas in arrival order
+    """
+    _require_client()
+    
+    formatted_messages = [{"role": "system", "content": system_prompt}]
+    formatted_messages.extend(messages)
+    
+    try:
+        await _rate_limiter.acquire(_estimate_tokens(formatted_messages, max_tokens))
+        logger.debug(f"Streaming OpenAI {MODEL} with {len(messages)} messages")
+        raw_response = await client.chat.completions.with_raw_response.create(
             model=MODEL,
             messages=formatted_messages,
             max_tokens=max_tokens,
             temperature=temperature,
+            stream=True,
         )
+        _rate_limiter.update_from_headers(raw_response.headers)
+        stream = raw_response.parse()
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise _friendly_error(e)
+
+
+class _CompletionBatcher:
+    """
+    Collects completion requests for a short debounce window and flushes them together.
+    
+    Requests with identical messages and parameters are folded into a single
+    call using ``n``; distinct requests in the same window are fanned out
+    concurrently over the shared HTTP connection pool.
+    """
+    
+    def __init__(self, window: float = 0.02, max_batch: int = 16):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Tuple[str, int, float], List[Dict[str, str]], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def submit(self, formatted_messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (json.dumps(formatted_messages, sort_keys=True), max_tokens, temperature)
+        self._pending.append((key, formatted_messages, future))
         
-        result = response.choices[0].message.content
-        logger.debug(f"OpenAI response received ({len(result)} chars)")
-        return result
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        
+        return await future
     
-    except APITimeoutError as e:
-        logger.error(f"OpenAI API timeout after 30s: {e}")
-        raise Exception("OpenAI timeout (30s). Please try with a shorter query or use knowledge base search.")
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
     
-    except RateLimitError as e:
-        logger.error(f"OpenAI rate limit exceeded: {e}")
-        raise Exception("OpenAI rate limit exceeded. Please wait a few seconds and try again, or use knowledge base.")
+    async def _run(self, batch) -> None:
+        groups: Dict[Tuple[str, int, float], list] = {}
+        for key, formatted_messages, future in batch:
+            groups.setdefault(key, []).append((formatted_messages, future))
+        if len(batch) > 1:
+            logger.debug(f"Flushing {len(batch)} batched completions as {len(groups)} API calls")
+        await asyncio.gather(*(self._run_group(key, group) for key, group in groups.items()))
     
-    except APIError as api_error:
-        error_msg = str(api_error)
-        logger.error(f"OpenAI API Error: {error_msg}")
+    async def _run_group(self, key, group) -> None:
+        _, max_tokens, temperature = key
+        futures = [future for _, future in group]
+        try:
+            contents = await _request_completions(group[0][0], max_tokens, temperature, n=len(group))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, content in zip(futures, contents):
+            if not future.done():
+                future.set_result(content)
+        # The API may return fewer choices than requested
+        for future in futures[len(contents):]:
+            if not future.done():
+                future.set_exception(RuntimeError(
+                    f"Expected {len(futures)} completions, got {len(contents)}"
+                ))
+
+
+_batcher = _CompletionBatcher()
+
+
+async def generate_ai_responses_batched(
+    message_batches: List[List[Dict[str, str]]],
+    system_prompt: str = "You are a helpful medical AI assistant. Provide accurate, professional medical information.",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+) -> List[str]:
+    """
+    Generate AI responses for several conversations, coalescing API calls.
+    
+    Concurrent callers (including other users) are collected for a short
+    window so identical prompts share one request and the rest are sent
+    together.
+    
+    Args:
+        message_batches: One list of conversation messages per response
+        system_prompt: System prompt applied to every conversation
+        max_tokens: Maximum tokens per response
+        temperature: Response randomness (0-2)
         
-        # Provide specific, actionable error messages
-        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower() or "401" in error_msg:
-            raise Exception("OpenAI API key invalid. Please check OPENAI_API_KEY in backend/.env file.")
-        elif "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
-            raise Exception("OpenAI quota exceeded. Please add credits at https://platform.openai.com/account/billing")
-        elif "model" in error_msg.lower():
-            raise Exception(f"Model '{MODEL}' not available. Try setting OPENAI_MODEL=gpt-4o-mini in backend/.env")
-        else:
-            raise Exception(f"OpenAI API error: {error_msg[:150]}. Using knowledge base fallback.")
+    Returns:
+        AI generated response texts, in the same order as message_batches
+    """
+    _require_client()
     
+    try:
+        return list(await asyncio.gather(*(
+            _batcher.submit([{"role": "system", "content": system_prompt}, *messages], max_tokens, temperature)
+            for messages in message_batches
+        )))
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Unexpected error in AI service: {error_msg}", exc_info=True)
-        # Re-raise if already a user-friendly exception
-        if "OpenAI" in error_msg or "API" in error_msg or "quota" in error_msg:
-            raise
-        # Otherwise, create generic error with fallback suggestion
-        raise Exception(f"AI service error: {error_msg[:100]}. Please try knowledge base search.")
+        raise _friendly_error(e)
 
 
 async def generate_discharge_summary(patient_data: Dict[str, str]) -> str:
@@ -112,51 +520,26 @@ async def generate_discharge_summary(patient_data: Dict[str, str]) -> str:
     Returns:
         AI generated discharge summary
     """
-    system_prompt = """You are an expert medical physician assistant specializing in creating comprehensive discharge summaries. 
-    Provide detailed, professional medical documentation following standard medical practices. 
-    Include appropriate medical terminology, proper formatting, and evidence-based recommendations."""
+    key = _cache_key("discharge", patient_data)
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.debug("Discharge summary served from cache")
+        return cached
     
-    user_prompt = f"""
-Based on the following patient information, generate a comprehensive discharge summary:
-
-PATIENT INFORMATION:
-- Name: {patient_data.get('patient_name', 'Not provided')}
-- Age: {patient_data.get('patient_age', 'Not provided')}
-- Gender: {patient_data.get('patient_gender', 'Not provided')}
-- MRN: {patient_data.get('mrn', 'Not provided')}
-- Admission Date: {patient_data.get('admission_date', 'Not provided')}
-- Discharge Date: {patient_data.get('discharge_date', 'Not provided')}
-
-CLINICAL DETAILS:
-- Chief Complaint: {patient_data.get('chief_complaint', 'Not provided')}
-- History of Present Illness: {patient_data.get('history_present_illness', 'Not provided')}
-- Past Medical History: {patient_data.get('past_medical_history', 'Not provided')}
-- Physical Examination: {patient_data.get('physical_examination', 'Not provided')}
-- Diagnosis: {patient_data.get('diagnosis', 'Not provided')}
-- Hospital Course: {patient_data.get('hospital_course', 'Not provided')}
-- Procedures: {patient_data.get('procedures_performed', 'Not provided')}
-- Medications During Stay: {patient_data.get('medications', 'Not provided')}
-
-Please generate:
-1. HOSPITAL COURSE SUMMARY: Concise narrative of the hospitalization
-2. DISCHARGE MEDICATIONS: Complete list with dosages, frequency, and duration
-3. FOLLOW-UP INSTRUCTIONS: Specific appointments and monitoring needed
-4. DIET: Detailed dietary recommendations and restrictions
-5. ACTIVITY: Activity level and restrictions
-6. WARNING SIGNS: Red flags requiring immediate medical attention
-7. PATIENT EDUCATION: Key points patient should understand
-
-Format professionally as a complete discharge summary.
-"""
+    fields = defaultdict(lambda: 'Not provided')
+    fields.update(patient_data)
+    user_prompt = _DISCHARGE_PROMPT_TEMPLATE.substitute(fields)
     
     messages = [{"role": "user", "content": user_prompt}]
     
-    return await generate_ai_response(
-        messages=messages,
-        system_prompt=system_prompt,
+    [result] = await generate_ai_responses_batched(
+        message_batches=[messages],
+        system_prompt=_DISCHARGE_SYSTEM_PROMPT,
         max_tokens=3000,
         temperature=0.5,  # Lower temperature for more consistent medical documentation
     )
+    _cache_set(key, result)
+    return result
 
 
 async def generate_diagnosis_assistance(symptoms: str, patient_history: str = "") -> str:
@@ -170,30 +553,24 @@ async def generate_diagnosis_assistance(symptoms: str, patient_history: str = ""
     Returns:
         AI generated diagnosis assistance
     """
-    system_prompt = """You are an expert diagnostic assistant physician. Provide differential diagnoses based on symptoms and patient history.
-    Always include: 1) Most likely diagnoses, 2) Red flags/concerning features, 3) Recommended investigations.
-    Emphasize that this is for clinical decision support and not a replacement for clinical judgment."""
+    key = _cache_key("diagnosis", [symptoms, patient_history])
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.debug("Diagnosis assistance served from cache")
+        return cached
     
-    user_prompt = f"""
-Patient presents with the following:
-
-SYMPTOMS: {symptoms}
-
-PATIENT HISTORY: {patient_history if patient_history else 'Not provided'}
-
-Please provide:
-1. Differential Diagnoses (in order of likelihood)
-2. Key Clinical Features supporting each diagnosis
-3. Red Flags or concerning features
-4. Recommended Investigations
-5. Initial Management Considerations
-"""
+    user_prompt = _DIAGNOSIS_PROMPT_TEMPLATE.substitute(
+        symptoms=symptoms,
+        patient_history=patient_history if patient_history else 'Not provided',
+    )
     
     messages = [{"role": "user", "content": user_prompt}]
     
-    return await generate_ai_response(
-        messages=messages,
-        system_prompt=system_prompt,
+    [result] = await generate_ai_responses_batched(
+        message_batches=[messages],
+        system_prompt=_DIAGNOSIS_SYSTEM_PROMPT,
         max_tokens=2000,
         temperature=0.6,
     )
+    _cache_set(key, result)
+    return result
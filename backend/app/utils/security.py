@@ -1,7 +1,95 @@
 """Utility functions for password hashing and verification."""
 
+import os
+import hmac
+import time
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# bcrypt>=4 is pyca's Rust implementation (PyO3), so hashing already runs
+# natively; keep the Python side of each call down to one encode + slice.
 import bcrypt
 
+BCRYPT_ROUNDS = 12
+BCRYPT_MAX_BYTES = 72
+BCRYPT_HASH_LENGTH = 60
+
+# Valid cost-12 hash of a random, discarded secret. Verifying against it when the
+# stored hash is missing or malformed keeps every verify_password call doing a
+# full KDF, so timing doesn't reveal "bad hash" vs "wrong password".
+_DUMMY_HASH = b"$2b$12$UzY8bnYpGQi6ggE4zHy4zOzWgAr3dp0CvxWW7Ut4VwI0N6zlKOpU6"
+
+# Successful verifications are remembered briefly so reconnecting clients skip the KDF.
+# Keys are HMACs under a per-process secret, so the plaintext is never stored and a
+# dumped cache can't be checked offline. Only successes are cached.
+VERIFY_CACHE_MAXSIZE = 10_000
+VERIFY_CACHE_TTL = 300  # seconds
+_PROCESS_SECRET = os.urandom(32)
+_verify_cache: "OrderedDict[bytes, float]" = OrderedDict()
+_verify_cache_lock = threading.Lock()
+
+
+def _verify_cache_key(plain_password: str, hashed_password: str) -> bytes:
+    message = plain_password.encode('utf-8') + b"|" + hashed_password.encode('utf-8')
+    return hmac.new(_PROCESS_SECRET, message, hashlib.sha256).digest()
+
+
+def _verify_cache_hit(key: bytes) -> bool:
+    with _verify_cache_lock:
+        expires_at = _verify_cache.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del _verify_cache[key]
+            return False
+        _verify_cache.move_to_end(key)
+        return True
+
+
+def _verify_cache_store(key: bytes) -> None:
+    with _verify_cache_lock:
+        _verify_cache[key] = time.monotonic() + VERIFY_CACHE_TTL
+        _verify_cache.move_to_end(key)
+        while len(_verify_cache) > VERIFY_CACHE_MAXSIZE:
+            _verify_cache.popitem(last=False)
+
+
+def clear_verify_cache() -> None:
+    """Forget all cached verifications (e.g. after a bulk credential reset)."""
+    global _PROCESS_SECRET
+    with _verify_cache_lock:
+        _verify_cache.clear()
+        _PROCESS_SECRET = os.urandom(32)
+
+
+# bcrypt at 12 rounds costs ~250ms of CPU; run it off the event loop.
+# Created lazily so importing this module (CLI scripts, workers) never spawns processes.
+_bcrypt_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_bcrypt_pool() -> ProcessPoolExecutor:
+    global _bcrypt_pool
+    if _bcrypt_pool is None:
+        _bcrypt_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _bcrypt_pool
+
+
+def shutdown_bcrypt_pool() -> None:
+    """Stop the bcrypt worker processes (called on app shutdown)."""
+    global _bcrypt_pool
+    if _bcrypt_pool is not None:
+        _bcrypt_pool.shutdown(wait=False, cancel_futures=True)
+        _bcrypt_pool = None
+
+
+def _password_bytes(password: str) -> bytes:
+    """Encode and truncate to bcrypt's 72 byte limit (slicing is a no-op when shorter)."""
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
 
 def hash_password(password: str) -> str:
     """
@@ -14,20 +102,14 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password
     """
-    # Truncate password to 72 bytes for bcrypt compatibility
-    password_bytes = password.encode('utf-8')
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    
     # Generate salt and hash password
-    salt = bcrypt.gensalt(rounds=12)
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    hashed = bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
     return hashed.decode('utf-8')
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _check_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify a password against its hash.
+    Verify a password against its hash with bcrypt (no caching).
     
     Args:
         plain_password: Plain text password
@@ -36,13 +118,61 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
+    if not isinstance(plain_password, str):
+        return False
+    password_bytes = _password_bytes(plain_password)
+    hashed_bytes = hashed_password.encode('utf-8') if isinstance(hashed_password, str) else b''
+    
+    well_formed = len(hashed_bytes) == BCRYPT_HASH_LENGTH and hmac.compare_digest(hashed_bytes[:2], b"$2")
     try:
-        # Truncate password to 72 bytes for bcrypt compatibility
-        password_bytes = plain_password.encode('utf-8')
-        if len(password_bytes) > 72:
-            password_bytes = password_bytes[:72]
+        matched = bcrypt.checkpw(password_bytes, hashed_bytes if well_formed else _DUMMY_HASH)
+    except ValueError:
+        # Right shape but unparsable salt - still pay for a full verify
+        bcrypt.checkpw(password_bytes, _DUMMY_HASH)
+        matched = well_formed = False
+    return matched and well_formed
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash, using the short-lived success cache.
+    
+    Args:
+        plain_password: Plain text password
+        hashed_password: Hashed password to verify against
         
-        hashed_bytes = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(password_bytes, hashed_bytes)
-    except Exception:
+    Returns:
+        True if password matches, False otherwise
+    """
+    if not isinstance(plain_password, str) or not isinstance(hashed_password, str):
+        return _check_password(plain_password, hashed_password)
+    key = _verify_cache_key(plain_password, hashed_password)
+    if _verify_cache_hit(key):
+        return True
+    matched = _check_password(plain_password, hashed_password)
+    if matched:
+        _verify_cache_store(key)
+    return matched
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the bcrypt process pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_bcrypt_pool(), hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bcrypt process pool without blocking the event loop."""
+    if not isinstance(plain_password, str):
         return False
+    loop = asyncio.get_running_loop()
+    if not isinstance(hashed_password, str):
+        # Still pay for a dummy verify, but off the event loop
+        return await loop.run_in_executor(_get_bcrypt_pool(), _check_password, plain_password, hashed_password)
+    key = _verify_cache_key(plain_password, hashed_password)
+    if _verify_cache_hit(key):
+        return True
+    matched = await loop.run_in_executor(_get_bcrypt_pool(), _check_password, plain_password, hashed_password)
+    if matched:
+        _verify_cache_store(key)
+    return matched
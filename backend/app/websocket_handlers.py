@@ -2,14 +2,57 @@
 WebSocket handler for real-time medical diagnosis and prescription streaming
 """
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import json
+import time
 import asyncio
 import logging
 from datetime import datetime
 
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 logger = logging.getLogger(__name__)
 
+# Static head of every stream frame, serialized once
+_STREAM_ENVELOPE_HEAD = b'{"type":"stream","chunk_type":'
+
+# Token streams send many frames per millisecond; reuse the ISO timestamp within a tick
+_TIMESTAMP_RESOLUTION = 0.001
+_last_tick = 0.0
+_last_timestamp = ''
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in ISO format, recomputed at most once per millisecond"""
+    global _last_tick, _last_timestamp
+    now = time.monotonic()
+    if now - _last_tick >= _TIMESTAMP_RESOLUTION or not _last_timestamp:
+        _last_tick = now
+        _last_timestamp = datetime.utcnow().isoformat()
+    return _last_timestamp
+
+# Max model deltas buffered per stream before the producer waits on the socket
+STREAM_QUEUE_SIZE = 64
+
+# Per-connection outbox: senders wait when it is full; a client that stays
+# full past the timeout is treated as stalled and dropped
+OUTBOX_SIZE = 256
+OUTBOX_PUT_TIMEOUT = 10.0
+
+# Progress updates closer together than this are coalesced (latest wins)
+PROGRESS_MIN_INTERVAL = 0.1
+
+DIAGNOSIS_SYSTEM_PROMPT = """You are an expert diagnostic assistant physician. Provide differential diagnoses based on symptoms, vital signs and patient history.
+Always include: 1) Most likely diagnoses with ICD-10 codes, 2) Red flags/concerning features, 3) Recommended investigations.
+Emphasize that this is for clinical decision support and not a replacement for clinical judgment."""
+
 
 class ConnectionManager:
     """Manages WebSocket connections and message routing"""
@@ -17,14 +60,24 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.user_sessions: Dict[str, Dict[str, Any]] = {}
+        self.outboxes: Dict[str, asyncio.Queue] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        # user_id -> {'last': monotonic time of last progress sent, 'pending': payload,
+        #             'flush': TimerHandle, 'task': running flush Task}
+        self._progress: Dict[str, Dict[str, Any]] = {}
     
     async def connect(self, websocket: WebSocket, user_id: str):
         """Accept and register a new WebSocket connection"""
         await websocket.accept()
+        if user_id in self.active_connections:
+            self.disconnect(user_id)
         self.active_connections[user_id] = websocket
+        outbox: asyncio.Queue = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.outboxes[user_id] = outbox
+        self._writers[user_id] = asyncio.create_task(self._writer(user_id, websocket, outbox))
         self.user_sessions[user_id] = {
             'websocket': websocket,
-            'connected_at': datetime.utcnow().isoformat(),
+            'connected_at': _utc_timestamp(),
             'messages_sent': 0,
             'current_session_id': None
         }
@@ -35,7 +88,7 @@ class ConnectionManager:
             'type': 'connection',
             'status': 'connected',
             'message': 'Connected to Natpudan AI Medical Assistant',
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _utc_timestamp()
         })
     
     def disconnect(self, user_id: str):
@@ -44,41 +97,141 @@ class ConnectionManager:
             del self.active_connections[user_id]
         if user_id in self.user_sessions:
             del self.user_sessions[user_id]
+        self.outboxes.pop(user_id, None)
+        progress_state = self._progress.pop(user_id, None)
+        if progress_state:
+            if progress_state['flush'] is not None:
+                progress_state['flush'].cancel()
+            if progress_state['task'] is not None:
+                progress_state['task'].cancel()
+        writer = self._writers.pop(user_id, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         logger.info(f"WebSocket disconnected: user_id={user_id}")
     
-    async def send_message(self, user_id: str, message: Dict[str, Any]):
-        """Send a message to a specific user"""
-        if user_id in self.active_connections:
+    async def _writer(self, user_id: str, websocket: WebSocket, outbox: asyncio.Queue):
+        """Drain a connection's outbox onto its socket, one frame at a time"""
+        while True:
+            payload = await outbox.get()
             try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
-                if user_id in self.user_sessions:
-                    self.user_sessions[user_id]['messages_sent'] += 1
-                return True
+                await websocket.send_text(payload)
             except Exception as e:
                 logger.error(f"Error sending message to {user_id}: {e}")
-                return False
-        return False
+                if self.active_connections.get(user_id) is websocket:
+                    self.disconnect(user_id)
+                return
+            session = self.user_sessions.get(user_id)
+            if session is not None:
+                session['messages_sent'] += 1
+    
+    def _take_pending_progress(self, user_id: str) -> Optional[bytes]:
+        """Remove and return a coalesced progress update that hasn't been sent yet"""
+        state = self._progress.get(user_id)
+        if not state or state['pending'] is None:
+            return None
+        if state['flush'] is not None:
+            state['flush'].cancel()
+            state['flush'] = None
+        payload, state['pending'] = state['pending'], None
+        state['last'] = time.monotonic()
+        return payload
+    
+    def _start_progress_flush(self, user_id: str, state: Dict[str, Any]):
+        """Timer callback: send the held-back update, keeping the task referenced until done"""
+        state['flush'] = None
+        task = asyncio.ensure_future(self._flush_progress(user_id))
+        state['task'] = task
+        
+        def _done(_):
+            if state['task'] is task:
+                state['task'] = None
+        task.add_done_callback(_done)
+    
+    async def _flush_progress(self, user_id: str):
+        payload = self._take_pending_progress(user_id)
+        if payload is not None:
+            await self._enqueue(user_id, payload)
+    
+    async def _send_raw(self, user_id: str, payload: bytes) -> bool:
+        """Queue an already-serialized JSON payload as a text frame"""
+        # A held-back progress update goes out first so frames stay in order
+        pending = self._take_pending_progress(user_id)
+        if pending is not None and not await self._enqueue(user_id, pending):
+            return False
+        return await self._enqueue(user_id, payload)
+    
+    async def _enqueue(self, user_id: str, payload: bytes) -> bool:
+        outbox = self.outboxes.get(user_id)
+        if outbox is None:
+            return False
+        try:
+            await asyncio.wait_for(outbox.put(payload.decode('utf-8')), OUTBOX_PUT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox full for {user_id} after {OUTBOX_PUT_TIMEOUT}s - dropping stalled connection")
+            websocket = self.active_connections.get(user_id)
+            self.disconnect(user_id)
+            if websocket is not None:
+                try:
+                    await websocket.close(code=1013)
+                except Exception:
+                    pass
+            return False
+        return True
+    
+    async def send_message(self, user_id: str, message: Dict[str, Any]):
+        """Send a message to a specific user"""
+        if user_id not in self.active_connections:
+            return False
+        return await self._send_raw(user_id, _dumps(message))
     
     async def send_stream_chunk(self, user_id: str, chunk_type: str, content: str, metadata: Optional[Dict] = None):
         """Send a streaming chunk to the user"""
-        message = {
-            'type': 'stream',
-            'chunk_type': chunk_type,
-            'content': content,
-            'metadata': metadata or {},
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        await self.send_message(user_id, message)
+        if user_id not in self.active_connections:
+            return False
+        # Only the variable fields are serialized per chunk
+        payload = b''.join((
+            _STREAM_ENVELOPE_HEAD, _dumps(chunk_type),
+            b',"content":', _dumps(content),
+            b',"metadata":', _dumps(metadata or {}),
+            b',"timestamp":"', _utc_timestamp().encode('ascii'), b'"}',
+        ))
+        return await self._send_raw(user_id, payload)
     
     async def send_progress(self, user_id: str, stage: str, progress: int, message: str):
-        """Send progress update to the user"""
-        await self.send_message(user_id, {
+        """
+        Send progress update to the user.
+        
+        Updates arriving within PROGRESS_MIN_INTERVAL of the last one are
+        coalesced: only the newest is kept and sent when the window ends (or
+        just before the next non-progress frame). Completion (100%) is never held.
+        """
+        if user_id not in self.active_connections:
+            return False
+        payload = _dumps({
             'type': 'progress',
             'stage': stage,
             'progress': progress,
             'message': message,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _utc_timestamp()
         })
+        
+        now = time.monotonic()
+        state = self._progress.setdefault(user_id, {'last': 0.0, 'pending': None, 'flush': None, 'task': None})
+        elapsed = now - state['last']
+        if progress >= 100 or elapsed >= PROGRESS_MIN_INTERVAL:
+            if state['flush'] is not None:
+                state['flush'].cancel()
+                state['flush'] = None
+            state['pending'] = None
+            state['last'] = now
+            return await self._enqueue(user_id, payload)
+        
+        state['pending'] = payload
+        if state['flush'] is None:
+            state['flush'] = asyncio.get_running_loop().call_later(
+                PROGRESS_MIN_INTERVAL - elapsed, self._start_progress_flush, user_id, state
+            )
+        return True
     
     async def send_error(self, user_id: str, error: str, details: Optional[str] = None):
         """Send error message to the user"""
@@ -86,7 +239,7 @@ class ConnectionManager:
             'type': 'error',
             'error': error,
             'details': details,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _utc_timestamp()
         })
     
     async def send_complete(self, user_id: str, result: Dict[str, Any]):
@@ -94,7 +247,7 @@ class ConnectionManager:
         await self.send_message(user_id, {
             'type': 'complete',
             'result': result,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _utc_timestamp()
         })
     
     def get_user_session(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -106,12 +259,109 @@ class ConnectionManager:
         return user_id in self.active_connections
 
 
+async def forward_stream(
+    manager: ConnectionManager,
+    user_id: str,
+    chunk_type: str,
+    deltas: AsyncIterator[str],
+    metadata: Optional[Dict] = None
+) -> str:
+    """
+    Forward model deltas to a user as stream chunks.
+    
+    Deltas pass through a bounded queue so a slow socket pauses reading from
+    the model instead of buffering the whole completion; whatever piles up
+    while a send is in flight is coalesced into the next frame.
+    
+    Returns:
+        The full streamed text
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    parts: List[str] = []
+    
+    async def produce():
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                await queue.put(delta)
+        finally:
+            await queue.put(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        finished = False
+        while not finished:
+            delta = await queue.get()
+            if delta is None:
+                break
+            pending = [delta]
+            while not queue.empty():
+                delta = queue.get_nowait()
+                if delta is None:
+                    finished = True
+                    break
+                pending.append(delta)
+            await manager.send_stream_chunk(user_id, chunk_type, ''.join(pending), metadata)
+        # Surface errors raised while reading the model stream
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+    return ''.join(parts)
+
+
 class StreamingDiagnosisHandler:
     """Handles streaming diagnosis with progress updates"""
     
     def __init__(self, connection_manager: ConnectionManager):
         self.manager = connection_manager
     
+    async def _stream_ai_diagnosis(
+        self,
+        user_id: str,
+        symptoms: List[str],
+        patient_info: Dict[str, Any],
+        vital_signs: Optional[Dict[str, Any]] = None
+    ):
+        """Stream the differential diagnosis straight from the model as it is generated"""
+        from app.utils.ai_service import stream_ai_response
+        
+        await self.manager.send_progress(user_id, 'differential', 30, 'Generating differential diagnoses...')
+        
+        user_prompt = f"""
+Patient presents with the following:
+
+SYMPTOMS: {json.dumps(symptoms)}
+
+VITAL SIGNS: {json.dumps(vital_signs) if vital_signs else 'Not provided'}
+
+PATIENT INFORMATION: {json.dumps(patient_info) if patient_info else 'Not provided'}
+
+Please provide:
+1. Differential Diagnoses (in order of likelihood, with ICD-10 codes)
+2. Key Clinical Features supporting each diagnosis
+3. Red Flags or concerning features
+4. Recommended Investigations
+"""
+        analysis = await forward_stream(
+            self.manager,
+            user_id,
+            'differential_diagnosis',
+            stream_ai_response(
+                [{"role": "user", "content": user_prompt}],
+                system_prompt=DIAGNOSIS_SYSTEM_PROMPT,
+                max_tokens=2000,
+                temperature=0.6,
+            )
+        )
+        
+        await self.manager.send_progress(user_id, 'complete', 100, 'Diagnosis complete!')
+        await self.manager.send_complete(user_id, {
+            'analysis': analysis,
+            'next_steps': 'prescription_generation'
+        })
+        logger.info(f"AI diagnosis streaming completed for user {user_id}")
+    
     async def stream_diagnosis(
         self,
         user_id: str,
@@ -123,8 +373,15 @@ class StreamingDiagnosisHandler:
         Stream diagnosis process with real-time updates
         """
         try:
-            # Stage 1: Analyzing symptoms
+            from app.utils.ai_service import is_ai_available
+            
             await self.manager.send_progress(user_id, 'symptoms_analysis', 10, 'Analyzing symptoms...')
+            if is_ai_available():
+                await self._stream_ai_diagnosis(user_id, symptoms, patient_info, vital_signs)
+                return
+            
+            # No AI configured - fall back to the simulated walkthrough
+            # Stage 1: Analyzing symptoms
             await asyncio.sleep(0.5)  # Simulate processing
             
             symptoms_analysis = {
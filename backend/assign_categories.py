@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 """Auto-assign categories to knowledge base documents based on filename patterns."""
 
+import re
+from collections import Counter
+from typing import Callable, Optional
+
+from sqlalchemy import case, update
+
 from app.database import SessionLocal
 from app.models import KnowledgeDocument
 
@@ -22,42 +28,85 @@ CATEGORY_MAPPINGS = {
     'pocket': 'Clinical Reference'
 }
 
+# Earlier entries in CATEGORY_MAPPINGS win when several keywords match
+_KEYWORD_PRIORITY = {keyword: idx for idx, keyword in enumerate(CATEGORY_MAPPINGS)}
+
+
+def _build_matcher() -> Callable[[str], Optional[str]]:
+    """
+    Compile all keywords into one multi-pattern matcher (single pass per filename).
+    
+    Uses an Aho-Corasick automaton when pyahocorasick is installed, otherwise a
+    compiled regex alternation with a lookahead so overlapping keywords are seen.
+    """
+    try:
+        import ahocorasick
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, priority in _KEYWORD_PRIORITY.items():
+            automaton.add_word(keyword, (priority, keyword))
+        automaton.make_automaton()
+        
+        def find_keywords(text: str):
+            return (value for _, value in automaton.iter(text))
+    except ImportError:
+        pattern = re.compile('(?=(' + '|'.join(map(re.escape, CATEGORY_MAPPINGS)) + '))')
+        
+        def find_keywords(text: str):
+            return ((_KEYWORD_PRIORITY[m.group(1)], m.group(1)) for m in pattern.finditer(text))
+    
+    def match_category(filename_lower: str) -> Optional[str]:
+        best = min(find_keywords(filename_lower), default=None)
+        return CATEGORY_MAPPINGS[best[1]] if best else None
+    
+    return match_category
+
+
+match_category = _build_matcher()
+
+
 def main():
     db = SessionLocal()
     try:
-        docs = db.query(KnowledgeDocument).all()
-        updated_count = 0
+        # Only the columns we need - no full ORM objects / identity-map tracking
+        docs = db.query(
+            KnowledgeDocument.id,
+            KnowledgeDocument.filename,
+            KnowledgeDocument.category,
+        ).all()
+        assignments = {}
+        category_counts = Counter()
         
         print(f"\n[CATEGORIZATION] Processing {len(docs)} documents...\n")
         
-        for doc in docs:
-            filename_lower = doc.filename.lower()
-            assigned_category = None
+        for doc_id, filename, category in docs:
+            # Only fill in documents without a category
+            if category and category.strip():
+                category_counts[category] += 1
+                continue
             
             # Find matching category
-            for keyword, category in CATEGORY_MAPPINGS.items():
-                if keyword in filename_lower:
-                    assigned_category = category
-                    break
-            
-            # Update if category found and not already set
-            if assigned_category and (not doc.category or doc.category.strip() == ''):
-                doc.category = assigned_category
-                updated_count += 1
-                print(f"[OK] {doc.filename[:50]:<50} -> {assigned_category}")
+            assigned_category = match_category(filename.lower())
+            if assigned_category:
+                category_counts[assigned_category] += 1
+                assignments[doc_id] = assigned_category
+                print(f"[OK] {filename[:50]:<50} -> {assigned_category}")
         
+        # One UPDATE ... SET category = CASE id WHEN ... END for all changed rows
+        if assignments:
+            db.execute(
+                update(KnowledgeDocument)
+                .where(KnowledgeDocument.id.in_(assignments))
+                .values(category=case(assignments, value=KnowledgeDocument.id))
+                .execution_options(synchronize_session=False)
+            )
         db.commit()
+        updated_count = len(assignments)
         print(f"\n[RESULT] Updated {updated_count}/{len(docs)} documents with categories")
         
-        # Show summary
-        categories = set()
-        for doc in docs:
-            if doc.category and doc.category.strip():
-                categories.add(doc.category)
-        
-        print(f"\n[CATEGORIES] {len(categories)} unique categories assigned:")
-        for cat in sorted(categories):
-            count = len([d for d in docs if d.category == cat])
+        # Show summary (counts were tallied in the pass above)
+        print(f"\n[CATEGORIES] {len(category_counts)} unique categories assigned:")
+        for cat, count in sorted(category_counts.items()):
             print(f"  - {cat}: {count} documents")
         
         print(f"\n[SUCCESS] Categorization complete!")
@@ -4,25 +4,396 @@ FAST Batch Knowledge Base Processor
 ====================================
 This script processes pending KB files ~50-100x faster by:
 1. Loading ALL pending files into memory first
-2. Batching texts together (500 at a time)
+2. Batching texts together (2048 at a time, length-sorted to cut padding)
 3. Embedding entire batches in single GPU/CPU calls
 4. Bulk-adding to FAISS index
 
 Expected: ~5-10 minutes instead of 5+ hours
 """
 
+import os
+
+# Must be set before numpy/torch/faiss load their OpenMP runtimes: idle OpenMP
+# workers otherwise busy-spin and steal cores from the other library's threads.
+os.environ.setdefault('OMP_WAIT_POLICY', 'PASSIVE')
+
 import json
+import hashlib
 import time
+import queue
 import pickle
+import sqlite3
+import struct
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Setup path
 sys.path.insert(0, '.')
 
-def main():
+# Texts handed to model.encode per call. encode() length-sorts each call before
+# splitting it into mini-batches and restores order afterwards, so this is also
+# the smart-batching window: wider means less padding per mini-batch.
+EMBED_BATCH_SIZE = 2048
+ENCODE_BATCH_SIZE_CPU = 128
+ENCODE_BATCH_SIZE_GPU = 512  # Half precision leaves room to saturate tensor cores
+CPU_HALF_PRECISION = os.getenv('KB_EMBED_CPU_HALF', '1') != '0'  # BF16 on CPUs with native support; 0 forces FP32
+EMBED_BACKEND = os.getenv('KB_EMBED_BACKEND', 'torch')  # 'onnx' needs optimum[onnxruntime]
+# encode(normalize_embeddings=True) already yields unit vectors for the inner-product
+# index; set to 1 to check each batch (debug only, costs a norm per vector)
+VERIFY_NORMS = os.getenv('KB_VERIFY_NORMS', '0') == '1'
+
+
+def load_onnx_model(SentenceTransformer, model_name, has_cuda):
+    """ONNX Runtime backend (fused attention/GELU/LayerNorm graph); None if unavailable.
+
+    sentence-transformers exports the model on first use when the repo ships no
+    ONNX file; encode() keeps the same signature.
+    """
+    provider = 'CUDAExecutionProvider' if has_cuda else 'CPUExecutionProvider'
+    try:
+        model = SentenceTransformer(model_name, backend='onnx', model_kwargs={'provider': provider})
+    except Exception as e:  # optimum / onnxruntime not installed, or export failed
+        print(f"  ONNX backend unavailable ({e}), using PyTorch")
+        return None
+    print(f"  Using ONNX Runtime ({provider})")
+    return model
+
+
+def cpu_has_native_bf16(torch):
+    """True if the CPU has AVX512-BF16 or AMX, where oneDNN BF16 matmuls beat FP32"""
+    probes = ('_is_avx512_bf16_supported', '_is_amx_tile_supported')
+    for name in probes:
+        probe = getattr(torch.cpu, name, None)
+        try:
+            if probe is not None and probe():
+                return True
+        except Exception:
+            pass
+    return False
+
+
+def load_cpu_model(SentenceTransformer, model_name):
+    """CPU path: use every core for intra-op work, BF16 only on CPUs with native support"""
+    try:
+        import torch
+    except ImportError:
+        return SentenceTransformer(model_name)
+    
+    torch.set_num_threads(os.cpu_count() or 8)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        pass  # Already fixed once parallel work has started
+    
+    model = SentenceTransformer(model_name, device='cpu')
+    # Without AVX512-BF16/AMX the BF16 kernels fall back and run slower than FP32
+    if CPU_HALF_PRECISION and cpu_has_native_bf16(torch):
+        model = model.to(torch.bfloat16)
+        precision = 'bf16'
+    else:
+        precision = 'fp32'
+    print(f"  Using CPU ({torch.get_num_threads()} threads, {precision})")
+    return model
+
+
+def load_embedding_model(model_name):
+    """Load the sentence transformer on GPU in BF16/FP16 when available.
+
+    Returns (model, encode_batch_size).
+    """
     from sentence_transformers import SentenceTransformer
+    
+    try:
+        import torch
+        has_cuda = torch.cuda.is_available()
+    except ImportError:
+        has_cuda = False
+    
+    if EMBED_BACKEND == 'onnx':
+        model = load_onnx_model(SentenceTransformer, model_name, has_cuda)
+        if model is not None:
+            return model, ENCODE_BATCH_SIZE_GPU if has_cuda else ENCODE_BATCH_SIZE_CPU
+    
+    if not has_cuda:
+        return load_cpu_model(SentenceTransformer, model_name), ENCODE_BATCH_SIZE_CPU
+    
+    model = SentenceTransformer(model_name, device='cuda')
+    if torch.cuda.is_bf16_supported():
+        model = model.to(torch.bfloat16)
+        precision = 'bf16'
+    else:
+        model = model.half()
+        precision = 'fp16'
+    print(f"  Using GPU ({torch.cuda.get_device_name(0)}, {precision})")
+    return model, ENCODE_BATCH_SIZE_GPU
+
+
+def start_encode_pool(model):
+    """Worker pool with one process per CUDA device, or None on single-device boxes"""
+    if getattr(model, 'backend', 'torch') != 'torch':
+        return None  # ONNX sessions are pinned to one provider/device
+    try:
+        import torch
+        device_count = torch.cuda.device_count()
+    except ImportError:
+        return None
+    if device_count < 2:
+        return None
+    print(f"  Sharding batches across {device_count} GPUs")
+    return model.start_multi_process_pool(target_devices=[f'cuda:{i}' for i in range(device_count)])
+
+
+MIN_TEXT_LENGTH = 50
+# MiniLM only sees MAX_SEQ_LENGTH tokens; the character cap (~2k tokens) keeps one
+# huge dump from bloating tokenization. Tune with KB_MAX_CHARS.
+MAX_TEXT_CHARS = int(os.getenv('KB_MAX_CHARS', '8192'))
+MAX_SEQ_LENGTH = 256
+# Characters of each document kept inline in the metadata pickle (loaded whole by
+# the app); the full text goes to the contents store. Tune with KB_CONTENT_PREFIX_CHARS.
+CONTENT_PREFIX_CHARS = int(os.getenv('KB_CONTENT_PREFIX_CHARS', '200'))
+QUEUE_SIZE = 2048  # Loaded documents buffered ahead of the embedder
+LOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # File reads release the GIL
+
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+HNSW_M = 32  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+HASH_SIZE = 16  # Content digest bytes; also the hash sidecar's header size
+UNLINK_WORKERS = 32  # Cleanup is syscall-latency bound, not CPU bound
+
+
+def create_index(faiss, dim=EMBEDDING_DIM, metric=None):
+    """New HNSW index (inner product by default): sub-linear search instead of a flat scan.
+
+    Vectors are stored as int8 scalar-quantized codes (384 B instead of 1.5 KB
+    per vector). Embeddings are unit-normalized, so every component lies in
+    [-1, 1]: the quantizer is trained on that fixed range up front instead of
+    on whatever the first batch happens to contain.
+    """
+    if metric is None:
+        metric = faiss.METRIC_INNER_PRODUCT
+    index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit_uniform, HNSW_M, metric)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    index.train(np.array([[-1.0] * dim, [1.0] * dim], dtype=np.float32))
+    return index
+
+
+def migrate_flat_index(faiss, index):
+    """Rebuild a brute-force IndexFlat as HNSW, keeping its metric and vector order"""
+    hnsw = create_index(faiss, index.d, index.metric_type)
+    if index.ntotal:
+        hnsw.add(index.reconstruct_n(0, index.ntotal))
+    return hnsw
+
+
+def open_or_create_index(faiss, index_path):
+    """Existing index (flat ones migrated to HNSW) or a new one"""
+    if not index_path.exists():
+        # Create new index (384 dimensions for all-MiniLM-L6-v2)
+        print("  Created new FAISS HNSW index (int8 codes)")
+        return create_index(faiss)
+    index = load_index(faiss, index_path)
+    print(f"  Loaded FAISS index with {index.ntotal} vectors")
+    if isinstance(index, faiss.IndexFlat):
+        # Indexes written before the HNSW switch: convert once, IDs stay positional
+        index = migrate_flat_index(faiss, index)
+        print("  Migrated flat index to HNSW")
+    return index
+
+
+def load_pending_file(path):
+    """Parse one pending JSON file; returns (text, metadata) or None if unusable"""
+    try:
+        data = _json_loads(path.read_bytes())
+    except Exception:
+        return None  # Skip bad files
+    text = (data.get('text') or '').strip()[:MAX_TEXT_CHARS]
+    if text and len(text) > MIN_TEXT_LENGTH:
+        return text, data.get('metadata', {})
+    return None
+
+
+def text_digest(text):
+    """16-byte content hash used to skip texts already embedded (this run or earlier)"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=HASH_SIZE).digest()
+
+
+def load_and_hash(path):
+    """Worker: (text, metadata, path, digest) for one pending file, or None"""
+    item = load_pending_file(path)
+    if item is None:
+        return None
+    return item[0], item[1], path, text_digest(item[0])
+
+
+def produce_pending(files, out_queue):
+    """Producer: read, parse and hash files on a thread pool, feeding the embedder in file order"""
+    try:
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as ex:
+            # map() in QUEUE_SIZE slices so finished-but-unqueued files stay bounded
+            for start in range(0, len(files), QUEUE_SIZE):
+                for item in ex.map(load_and_hash, files[start:start + QUEUE_SIZE]):
+                    if item is not None:
+                        out_queue.put(item)
+    finally:
+        out_queue.put(None)
+
+
+def load_index(faiss, index_path):
+    """Read the existing FAISS index into memory"""
+    return faiss.read_index(str(index_path))
+
+
+def load_metadata(metadata_path):
+    """Load the metadata pickle read by LocalVectorKnowledgeBase.
+
+    Returns (metadata_list, last_id). ``last_id`` is the counter persisted as
+    'last_id'; older files without it fall back to a one-off max() scan.
+    """
+    if not metadata_path.exists():
+        return [], 0
+    with open(metadata_path, 'rb') as f:
+        metadata_obj = pickle.load(f)
+    # Handle dict format with 'documents' key
+    if isinstance(metadata_obj, dict) and 'documents' in metadata_obj:
+        metadata_list = metadata_obj.get('documents', [])
+        last_id = metadata_obj.get('last_id')
+    elif isinstance(metadata_obj, list):
+        metadata_list = metadata_obj
+        last_id = None
+    else:
+        return [], 0
+    
+    if last_id is None:
+        last_id = compute_max_id(metadata_list)
+    return metadata_list, last_id
+
+
+def compute_max_id(metadata_list):
+    """Current max ID (handles various metadata formats) - legacy files only"""
+    ids = (m.get('id', 0) if isinstance(m, dict) else int(m)
+           for m in metadata_list if isinstance(m, (dict, int, float)))
+    return max(0, max(ids, default=0))
+
+
+def collect_content_hashes(metadata_list):
+    """Stored content digests of all entries (sidecar rebuild).
+
+    Digests are read, not recomputed, so this is one pass of dict lookups -
+    cheaper than shipping the entries to worker processes would be.
+    """
+    hashes = {m.get('content_hash') for m in metadata_list if isinstance(m, dict)}
+    hashes.discard(None)
+    return hashes
+
+
+def metadata_stamp(metadata_path):
+    """(size, mtime_ns) of the metadata pickle, packed into one HASH_SIZE header"""
+    st = metadata_path.stat()
+    return struct.pack('<qq', st.st_size, st.st_mtime_ns)
+
+
+def load_hash_sidecar(hashes_path, metadata_path):
+    """Content digests of every indexed document, without unpickling the metadata.
+
+    The sidecar is a stamp of the metadata pickle it matches followed by
+    appended digests. Returns None if either file is missing or the pickle was
+    rewritten by something else since (e.g. LocalVectorKnowledgeBase).
+    """
+    if not hashes_path.exists() or not metadata_path.exists():
+        return None
+    data = hashes_path.read_bytes()
+    if len(data) % HASH_SIZE or data[:HASH_SIZE] != metadata_stamp(metadata_path):
+        return None
+    return {data[i:i + HASH_SIZE] for i in range(HASH_SIZE, len(data), HASH_SIZE)}
+
+
+def save_hash_sidecar(hashes_path, metadata_path, digests, append):
+    """Append (or rewrite with) ``digests`` and restamp against the saved pickle"""
+    with open(hashes_path, 'r+b' if append else 'wb') as f:
+        f.seek(0, os.SEEK_END)
+        if not append:
+            f.write(bytes(HASH_SIZE))  # Header placeholder
+        f.write(b''.join(digests))
+        f.seek(0)
+        f.write(metadata_stamp(metadata_path))
+
+
+def load_checkpoint(keys_path, vectors_path):
+    """Embeddings saved by an interrupted run, as {digest: vector}.
+
+    Vectors are appended before their keys, so a torn final write only loses
+    the unmatched tail.
+    """
+    if not keys_path.exists() or not vectors_path.exists():
+        return {}
+    keys = keys_path.read_bytes()
+    vectors = np.fromfile(vectors_path, dtype=np.float32)
+    count = min(len(keys) // HASH_SIZE, len(vectors) // EMBEDDING_DIM)
+    vectors = vectors[:count * EMBEDDING_DIM].reshape(count, EMBEDDING_DIM)
+    return {keys[i * HASH_SIZE:(i + 1) * HASH_SIZE]: vectors[i] for i in range(count)}
+
+
+def append_checkpoint(keys_path, vectors_path, digests, embeddings):
+    """Persist one embedded batch so a crashed run can resume without re-encoding it"""
+    with open(vectors_path, 'ab') as f:
+        f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+    with open(keys_path, 'ab') as f:
+        f.write(b''.join(digests))
+
+
+def store_contents(contents_path, rows):
+    """Write (id, full text) rows to the SQLite contents store, keyed by metadata 'id'"""
+    conn = sqlite3.connect(str(contents_path))
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS contents (id INTEGER PRIMARY KEY, text TEXT NOT NULL)')
+        with conn:
+            # REPLACE: a rerun after a crash reassigns the same ids
+            conn.executemany('INSERT OR REPLACE INTO contents (id, text) VALUES (?, ?)', rows)
+    finally:
+        conn.close()
+
+
+def unlink_quietly(path):
+    """Delete one processed file; returns True if it was removed"""
+    try:
+        path.unlink()
+        return True
+    except OSError:
+        return False
+
+
+def delete_files(paths):
+    """Delete processed files concurrently; returns how many were removed"""
+    if not paths:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(UNLINK_WORKERS, len(paths))) as ex:
+        return sum(ex.map(unlink_quietly, paths))
+
+
+def write_atomic(path, write):
+    """Write via a temp file + rename so readers never see a partial file.
+
+    ``write`` receives the temp path.
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def main():
     import faiss
     
     print("=" * 60)
@@ -34,40 +405,13 @@ def main():
     kb_dir = Path('data/knowledge_base')
     index_path = kb_dir / 'local_faiss_index.bin'
     metadata_path = kb_dir / 'local_metadata.pkl'
+    hashes_path = kb_dir / 'local_content_hashes.bin'
+    contents_path = kb_dir / 'local_contents.sqlite'
+    checkpoint_keys = kb_dir / 'embedding_checkpoint.keys'
+    checkpoint_vectors = kb_dir / 'embedding_checkpoint.f32'
     
-    # Load existing index and metadata
-    print("\n[1/5] Loading existing KB...")
-    
-    if index_path.exists():
-        index = faiss.read_index(str(index_path))
-        print(f"  Loaded FAISS index with {index.ntotal} vectors")
-    else:
-        # Create new index (384 dimensions for all-MiniLM-L6-v2)
-        index = faiss.IndexFlatIP(384)
-        print("  Created new FAISS index")
-    
-    if metadata_path.exists():
-        with open(metadata_path, 'rb') as f:
-            metadata_obj = pickle.load(f)
-        # Handle dict format with 'documents' key
-        if isinstance(metadata_obj, dict) and 'documents' in metadata_obj:
-            metadata_list = metadata_obj.get('documents', [])
-        elif isinstance(metadata_obj, list):
-            metadata_list = metadata_obj
-        else:
-            metadata_list = []
-        print(f"  Loaded {len(metadata_list)} metadata entries")
-    else:
-        metadata_list = []
-        print("  Created new metadata list")
-    
-    # Load embedding model
-    print("\n[2/5] Loading embedding model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("  Model loaded (all-MiniLM-L6-v2, 384 dims)")
-    
-    # Load all pending files
-    print("\n[3/5] Loading pending files...")
+    # Scan first - nothing else is loaded when there is no work
+    print("\n[1/5] Scanning pending files...")
     files = sorted(pending_dir.glob('*.json'))
     total_files = len(files)
     print(f"  Found {total_files} pending files")
@@ -76,115 +420,205 @@ def main():
         print("\n  No pending files to process!")
         return
     
-    # Load all texts and metadata into memory
+    # Load embedding model
+    print("\n[2/5] Loading embedding model...")
+    model, encode_batch_size = load_embedding_model('all-MiniLM-L6-v2')
+    model.max_seq_length = MAX_SEQ_LENGTH  # Bound padding per mini-batch to the model's window
+    print("  Model loaded (all-MiniLM-L6-v2, 384 dims)")
+    pool = start_encode_pool(model)
+    # Each device gets a full batch per round
+    embed_batch_size = EMBED_BATCH_SIZE * (len(pool['processes']) if pool else 1)
+    
+    # Content hashes of documents already in the KB; the metadata pickle itself
+    # is only unpickled up front when the append-only sidecar is missing or stale
+    metadata_list = None
+    existing_hashes = load_hash_sidecar(hashes_path, metadata_path)
+    rebuild_hashes = existing_hashes is None
+    if rebuild_hashes:
+        metadata_list, max_id = load_metadata(metadata_path)
+        existing_hashes = collect_content_hashes(metadata_list)
+        print(f"  Loaded {len(metadata_list)} metadata entries (last id {max_id})")
+    else:
+        print(f"  Loaded {len(existing_hashes)} content hashes")
+    
+    checkpoint = load_checkpoint(checkpoint_keys, checkpoint_vectors)
+    if checkpoint:
+        print(f"  Resuming with {len(checkpoint)} embeddings from an interrupted run")
+    kb_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Producer parses files while the consumer below embeds full batches,
+    # so disk/JSON work overlaps with the model instead of preceding it
     texts = []
     metadatas = []
     file_paths = []
+    content_hashes = []
+    already_indexed = []  # Pending files whose text is already in the KB
+    # Repeated boilerplate is embedded once: hash -> row in the unique embeddings
+    seen = {}
+    unique_rows = []
     
-    for f in files:
-        try:
-            with open(f, 'r', encoding='utf-8') as fh:
-                data = json.load(fh)
-            text = data.get('text', '').strip()
-            meta = data.get('metadata', {})
-            
-            if text and len(text) > 50:
+    pending_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    producer = threading.Thread(target=produce_pending, args=(files, pending_queue), daemon=True)
+    
+    print("\n[3/5] Embedding and indexing documents as they load...")
+    start_time = time.time()
+    # Unique vectors, sized for the worst case (every file unique); rows are written in place.
+    # Kept for later duplicates - the per-document expansion only exists one chunk at a time.
+    all_embeddings = np.empty((total_files, EMBEDDING_DIM), dtype=np.float32)
+    reused = 0
+    batch_num = 0
+    index = None  # Opened on the first add, so runs with nothing new never touch it
+    indexed = 0  # Documents (positions in unique_rows) already added to the index
+    
+    def add_ready_vectors():
+        """Add every loaded document whose vector is available, in document order"""
+        nonlocal index, indexed
+        if indexed == len(unique_rows):
+            return
+        if index is None:
+            index = open_or_create_index(faiss, index_path)
+        index.add(all_embeddings[unique_rows[indexed:]])
+        indexed = len(unique_rows)
+    
+    producer.start()
+    
+    batch_texts = []
+    batch_rows = []
+    batch_hashes = []
+    done = False
+    try:
+        while not done:
+            item = pending_queue.get()
+            if item is None:
+                done = True
+            else:
+                text, meta, path, h = item
+                if h in existing_hashes:
+                    already_indexed.append(path)
+                    continue
                 texts.append(text)
                 metadatas.append(meta)
-                file_paths.append(f)
-        except Exception as e:
-            pass  # Skip bad files
+                file_paths.append(path)
+                content_hashes.append(h)
+                row = seen.get(h)
+                if row is None:
+                    row = seen[h] = len(seen)
+                    cached = checkpoint.get(h)
+                    if cached is not None:
+                        all_embeddings[row] = cached
+                        reused += 1
+                    else:
+                        batch_texts.append(text)
+                        batch_rows.append(row)
+                        batch_hashes.append(h)
+                unique_rows.append(row)
+            
+            if batch_texts and (done or len(batch_texts) >= embed_batch_size):
+                batch_num += 1
+                print(f"  Embedding batch {batch_num} ({len(batch_texts)} texts, {len(texts)} loaded so far)...", end='', flush=True)
+                
+                embeddings = model.encode(
+                    batch_texts,
+                    batch_size=encode_batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    pool=pool
+                )
+                if VERIFY_NORMS:
+                    norms = np.linalg.norm(embeddings, axis=1)
+                    if not np.allclose(norms, 1.0, atol=1e-3):
+                        print(f" [WARNING] Embeddings not unit length (norms {norms.min():.4f}-{norms.max():.4f})", end='')
+                all_embeddings[batch_rows] = embeddings
+                append_checkpoint(checkpoint_keys, checkpoint_vectors, batch_hashes, embeddings)
+                batch_texts = []
+                batch_rows = []
+                batch_hashes = []
+                print(f" Done!")
+                add_ready_vectors()
+        add_ready_vectors()  # Documents served from the checkpoint or duplicates after the last batch
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+    producer.join()
     
     valid_count = len(texts)
     print(f"  Loaded {valid_count} valid documents")
+    if already_indexed:
+        print(f"  Skipped {len(already_indexed)} documents already in the KB")
+    if reused:
+        print(f"  Reused {reused} checkpointed embeddings")
     
     if valid_count == 0:
         print("\n  No valid documents to embed!")
+        delete_files([checkpoint_keys, checkpoint_vectors])
+        if already_indexed:
+            print(f"  Deleted {delete_files(already_indexed)} already-indexed files")
         return
     
-    # Batch embed all texts at once
-    print("\n[4/5] Batch embedding all documents...")
-    batch_size = 512  # Process 512 texts at a time for efficiency
-    
-    start_time = time.time()
-    all_embeddings = []
-    
-    for i in range(0, valid_count, batch_size):
-        batch_texts = texts[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (valid_count + batch_size - 1) // batch_size
-        
-        print(f"  Embedding batch {batch_num}/{total_batches} ({len(batch_texts)} texts)...", end='', flush=True)
-        
-        embeddings = model.encode(
-            batch_texts,
-            batch_size=128,
-            show_progress_bar=False,
-            convert_to_numpy=True,
-            normalize_embeddings=True
-        )
-        all_embeddings.append(embeddings)
-        print(f" Done!")
-    
-    # Concatenate all embeddings
-    all_embeddings = np.vstack(all_embeddings).astype('float32')
+    unique_count = len(seen)
+    if unique_count < valid_count:
+        print(f"  Skipped {valid_count - unique_count} duplicate texts ({unique_count} unique)")
+    del all_embeddings
     embed_time = time.time() - start_time
     print(f"  Embedded {valid_count} documents in {embed_time:.1f}s ({valid_count/embed_time:.1f} docs/sec)")
     
-    # Add to FAISS index
-    print("\n[5/5] Adding to FAISS index...")
-    
-    # Get current max ID (handle various metadata formats)
-    max_id = 0
-    if metadata_list:
-        for m in metadata_list:
-            if isinstance(m, dict):
-                max_id = max(max_id, m.get('id', 0))
-            elif isinstance(m, (int, float)):
-                max_id = max(max_id, int(m))
-    
-    # Add embeddings to index
-    index.add(all_embeddings)
-    
-    # Add metadata entries
-    for i, meta in enumerate(metadatas):
-        entry = {
-            'id': max_id + i + 1,
-            'content': texts[i][:1000],  # Store first 1000 chars
+    print("\n[4/5] Adding metadata entries...")
+    if metadata_list is None:
+        metadata_list, max_id = load_metadata(metadata_path)
+        print(f"  Loaded {len(metadata_list)} metadata entries (last id {max_id})")
+    
+    # Add metadata entries (built in one comprehension, appended with one extend)
+    doc_ids = range(max_id + 1, max_id + 1 + valid_count)
+    metadata_list.extend([
+        {
+            'id': doc_id,
+            'content': text[:CONTENT_PREFIX_CHARS],  # Short preview; full text is in the contents store
+            'content_hash': h,
             **meta
         }
-        metadata_list.append(entry)
+        for doc_id, text, h, meta in zip(doc_ids, texts, content_hashes, metadatas)
+    ])
     
     print(f"  Added {valid_count} vectors to index")
     print(f"  Index now has {index.ntotal} total vectors")
     
     # Save index and metadata
-    print("\n[6/6] Saving to disk...")
+    print("\n[5/5] Saving to disk and cleaning up...")
     
-    # Ensure directory exists
-    kb_dir.mkdir(parents=True, exist_ok=True)
+    # Full texts first, so every id the metadata refers to can be looked up
+    store_contents(contents_path, zip(doc_ids, texts))
+    print(f"  Saved full text: {contents_path}")
     
-    faiss.write_index(index, str(index_path))
+    # Stream straight to a temp file (no in-memory copy of the whole index)
+    write_atomic(index_path, lambda tmp: faiss.write_index(index, str(tmp)))
     print(f"  Saved FAISS index: {index_path}")
     
     # Save metadata in the expected format (dict with 'documents' key)
     metadata_obj = {
         'documents': metadata_list,
-        'document_count': len(metadata_list)
+        'document_count': len(metadata_list),
+        'last_id': max_id + valid_count
     }
-    with open(metadata_path, 'wb') as f:
-        pickle.dump(metadata_obj, f)
+    
+    def dump_metadata(tmp):
+        with open(tmp, 'wb') as f:
+            pickle.dump(metadata_obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    write_atomic(metadata_path, dump_metadata)
     print(f"  Saved metadata: {metadata_path}")
     
-    # Delete processed files
-    print("\n[7/7] Cleaning up processed files...")
-    deleted = 0
-    for f in file_paths:
-        try:
-            f.unlink()
-            deleted += 1
-        except:
-            pass
+    # Only this run's digests are written unless the sidecar has to be rebuilt
+    if rebuild_hashes:
+        save_hash_sidecar(hashes_path, metadata_path, existing_hashes.union(content_hashes), append=False)
+    else:
+        save_hash_sidecar(hashes_path, metadata_path, set(content_hashes), append=True)
+    
+    # Everything is persisted; the next run starts without a checkpoint
+    delete_files([checkpoint_keys, checkpoint_vectors])
+    
+    # Delete processed files (only these - the pending dir may be receiving new ones)
+    deleted = delete_files(file_paths + already_indexed)
     print(f"  Deleted {deleted} processed files")
     
     # Summary
@@ -10,9 +10,13 @@ This adds 22 new columns:
 - 2 complaint fields (chief_complaints JSON, present_history JSON)
 """
 
+import logging
 import sqlite3
 from pathlib import Path
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 # Database path
 DB_PATH = Path(__file__).parent / "natpudan.db"
 
@@ -20,19 +24,21 @@ def migrate_patient_intake():
     """Add new columns to patient_intakes table"""
     
     if not DB_PATH.exists():
-        print(f"[ERROR] Database not found at {DB_PATH}")
-        print("   Run the backend server first to create the database.")
+        logger.error(f"[ERROR] Database not found at {DB_PATH}\n"
+                     "   Run the backend server first to create the database.")
         return False
     
-    print(f" Migrating database: {DB_PATH}")
+    logger.info(f"Migrating database: {DB_PATH}")
     
-    conn = sqlite3.connect(DB_PATH)
+    # Autocommit mode so the explicit BEGIN below covers the ALTER TABLEs too
+    # (the default mode commits each DDL statement on its own)
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
     cursor = conn.cursor()
     
     # Check if table exists
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='patient_intakes'")
     if not cursor.fetchone():
-        print("[ERROR] Table 'patient_intakes' not found. Create it first by running the backend.")
+        logger.error("[ERROR] Table 'patient_intakes' not found. Create it first by running the backend.")
         conn.close()
         return False
     
@@ -73,59 +79,72 @@ def migrate_patient_intake():
     added_count = 0
     skipped_count = 0
     
-    print("\n Adding columns...")
-    
-    for column_name, column_type in new_columns:
-        if column_name in existing_columns:
-            print(f"     {column_name} - Already exists, skipping")
-            skipped_count += 1
-        else:
-            try:
-                cursor.execute(f"ALTER TABLE patient_intakes ADD COLUMN {column_name} {column_type}")
-                print(f"   [OK] {column_name} - Added successfully")
-                added_count += 1
-            except sqlite3.OperationalError as e:
-                print(f"   [WARNING]  {column_name} - Error: {e}")
+    logger.info("Adding columns...")
+    messages = []
     
-    # Commit changes
-    conn.commit()
-    conn.close()
+    # All columns are added in one transaction, with a single commit
+    try:
+        cursor.execute("BEGIN")
+        try:
+            for column_name, column_type in new_columns:
+                if column_name in existing_columns:
+                    messages.append(f"     {column_name} - Already exists, skipping")
+                    skipped_count += 1
+                else:
+                    cursor.execute(f"ALTER TABLE patient_intakes ADD COLUMN {column_name} {column_type}")
+                    messages.append(f"   [OK] {column_name} - Added successfully")
+                    added_count += 1
+            
+            # Commit changes
+            cursor.execute("COMMIT")
+        except sqlite3.OperationalError as e:
+            # One failed column rolls back the whole migration
+            cursor.execute("ROLLBACK")
+            messages.append(f"   [ERROR] {e} - migration rolled back, no columns were added")
+            logger.error("\n".join(messages))
+            return False
+        except BaseException:
+            # Leave the table as it was rather than half-migrated
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    logger.info("\n".join(messages))
     
     # Summary
-    print("\n" + "="*60)
-    print(f"[OK] Migration complete!")
-    print(f"   - Added: {added_count} columns")
-    print(f"   - Skipped: {skipped_count} columns (already exist)")
-    print(f"   - Total new columns: {len(new_columns)}")
-    print("="*60)
+    logger.info("\n".join([
+        "=" * 60,
+        "[OK] Migration complete!",
+        f"   - Added: {added_count} columns",
+        f"   - Skipped: {skipped_count} columns (already exist)",
+        f"   - Total new columns: {len(new_columns)}",
+        "=" * 60,
+    ]))
     
     if added_count > 0:
-        print("\n[READY] Your database is now ready for extended patient intake features!")
-        print("   You can now:")
-        print("   1. Restart the backend server")
-        print("   2. Use the Patient Intake form with all new fields")
-        print("   3. Store anthropometry, vitals, and structured complaints")
+        logger.info("\n".join([
+            "[READY] Your database is now ready for extended patient intake features!",
+            "   You can now:",
+            "   1. Restart the backend server",
+            "   2. Use the Patient Intake form with all new fields",
+            "   3. Store anthropometry, vitals, and structured complaints",
+        ]))
     else:
-        print("\n[TIP] All columns already exist. Database is up to date!")
+        logger.info("[TIP] All columns already exist. Database is up to date!")
     
     return True
 
 if __name__ == "__main__":
-    print("=" * 60)
-    print("Patient Intake Database Migration")
-    print("=" * 60)
-    print()
+    logger.info("Patient Intake Database Migration")
     
     try:
         success = migrate_patient_intake()
         if not success:
-            print("\n[ERROR] Migration failed. Please check the errors above.")
+            logger.error("[ERROR] Migration failed. Please check the errors above.")
             exit(1)
     except Exception as e:
-        print(f"\n[ERROR] Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[ERROR] Unexpected error: {e}")
         exit(1)
     
-    print("\n[OK] Migration script finished successfully!")
+    logger.info("[OK] Migration script finished successfully!")
     exit(0)
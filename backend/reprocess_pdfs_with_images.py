@@ -8,7 +8,16 @@ Reprocess all PDFs with Enhanced KB Processor
 
 import os
 import sys
+import json
+import time
 import logging
+import logging.handlers
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Optional
 from pathlib import Path
 from datetime import datetime
 
@@ -16,17 +25,373 @@ from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
+import httpx
+
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.services.enhanced_kb_processor import EnhancedKBProcessor, PYMUPDF_AVAILABLE, OPENAI_AVAILABLE
 
+# HTTP/2 lets concurrent description requests share one connection;
+# needs the optional h2 package, otherwise HTTP/1.1 keep-alive pooling
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_bytes(obj, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_bytes(obj, indent: bool = False) -> bytes:
+        if indent:
+            return json.dumps(obj, indent=2).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# PDF text/image extraction is CPU-bound and runs on a process pool;
+# image storage and AI descriptions stay in the main process.
+REPROCESS_WORKERS = int(os.getenv('REPROCESS_WORKERS', str(min(os.cpu_count() or 1, 6))))
+
+# PDFs longer than this are split into page ranges extracted by several
+# workers, so a single huge PDF doesn't leave the rest of the pool idle
+PAGE_PARALLEL_THRESHOLD = int(os.getenv('PAGE_PARALLEL_THRESHOLD', '100'))
+
+# Image writes and AI descriptions are I/O-bound, so several run at once on a
+# thread pool.
+# OPENAI_RPM_LIMIT (requests per minute, 0 = unlimited) spaces out request
+# starts; 429/5xx responses are retried with backoff by the OpenAI client.
+DESCRIBE_CONCURRENCY = int(os.getenv('DESCRIBE_CONCURRENCY', '8'))
+
+# Images of one PDF described per Vision request (1 = one request per image)
+DESCRIBE_BATCH_SIZE = max(1, int(os.getenv('DESCRIBE_BATCH_SIZE', '4')))
+OPENAI_RPM_LIMIT = int(os.getenv('OPENAI_RPM_LIMIT', '0'))
+
+# Extracted PDFs whose image jobs may still be in flight. The main loop keeps
+# taking extraction results until this many PDFs are waiting on descriptions.
+MAX_PENDING_PDFS = int(os.getenv('MAX_PENDING_PDFS', '16'))
+
+# Descriptions are cached by image hash across runs, so logos and figures
+# repeated between PDFs are only sent to the Vision API once
+DESCRIPTION_CACHE_FILE = "descriptions_cache.json"
+DESCRIPTION_CACHE_SAVE_EVERY = 50
+
+# PDFs finished in earlier runs are recorded by size and mtime and skipped,
+# so an interrupted run resumes where it stopped. REPROCESS_ALL=1 redoes all.
+CHECKPOINT_FILE = "processed_pdfs.json"
+CHECKPOINT_SAVE_EVERY = 10
+REPROCESS_ALL = os.getenv('REPROCESS_ALL', '0') == '1'
+
+# Image metadata is written as one JSON line per image into a single manifest
+# per document, rather than a {hash}.json file next to every image
+IMAGE_MANIFEST_FILE = "images_manifest.jsonl"
+
+# O_BINARY keeps Windows from translating newlines in image bytes
+_RAW_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# Per-worker processor, created once by the pool initializer
+_worker_processor = None
+
+
+@dataclass(slots=True)
+class PdfResult:
+    """Outcome of reprocessing one PDF; time_ms is worker extraction time"""
+    filename: str
+    status: str = 'ok'
+    pages: int = 0
+    text_chunks: int = 0
+    images: int = 0
+    stored_images: int = 0
+    error: Optional[str] = None
+    time_ms: float = 0.0
+
+
+class _RequestPacer:
+    """Thread-safe spacing of request starts to stay under an RPM budget"""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class _JsonStore:
+    """Persistent str -> value map, saved atomically every `save_every` puts.
+
+    Thread-safe; used for the description cache shared by the describe
+    threads and for the processed-PDF checkpoint.
+    """
+
+    def __init__(self, path: Path, save_every: int):
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        try:
+            with open(path, 'rb') as f:
+                self._data = _json_loads(f.read())
+        except FileNotFoundError:
+            self._data = {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable {path}: {e}")
+            self._data = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str):
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._data[key] = value
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            if self._unsaved:
+                self._save_locked()
+
+    def _save_locked(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_json_bytes(self._data))
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+def _init_worker(storage_dir: str, log_queue):
+    # Worker log records go through the parent's QueueListener, so one thread
+    # writes to stderr instead of every process contending for it
+    logging.getLogger().handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    global _worker_processor
+    _worker_processor = EnhancedKBProcessor(storage_dir=storage_dir)
+
+
+def _fingerprint(pdf_path: Path) -> str:
+    st = pdf_path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _extract_pdf(task):
+    """Pool worker: extract one page range of a PDF. Only picklable dicts are sent back."""
+    pdf_path, start_page, end_page = task
+    started = time.perf_counter()
+    try:
+        result = _worker_processor.extract_text_and_images(pdf_path, start_page, end_page)
+    except Exception as e:
+        result = {'error': str(e)}
+    return task, result, (time.perf_counter() - started) * 1000
+
+
+def _plan_extraction(processor, pdf_files):
+    """Split PDFs into (path, start_page, end_page) extraction tasks.
+
+    Returns the task list and the number of tasks per PDF path.
+    """
+    tasks = []
+    parts_per_pdf = {}
+    for pdf_path in pdf_files:
+        pdf_name = str(pdf_path)
+        page_count = processor.count_pages(pdf_name)
+        if page_count > PAGE_PARALLEL_THRESHOLD and REPROCESS_WORKERS > 1:
+            step = -(-page_count // REPROCESS_WORKERS)
+            ranges = [(start, start + step) for start in range(0, page_count, step)]
+        else:
+            ranges = [(0, None)]
+        tasks.extend((pdf_name, start, end) for start, end in ranges)
+        parts_per_pdf[pdf_name] = len(ranges)
+    return tasks, parts_per_pdf
+
+
+def _merge_parts(parts):
+    """Combine page-range results of one PDF, in page order"""
+    parts.sort(key=lambda part: part[0])
+    results = [result for _, result in parts]
+    for result in results:
+        if 'error' in result:
+            return result
+    if len(results) == 1:
+        return results[0]
+    
+    text_chunks = [chunk for result in results for chunk in result.get('text_chunks', [])]
+    images = [image for result in results for image in result.get('images', [])]
+    return {
+        'text_chunks': text_chunks,
+        'images': images,
+        'metadata': {
+            'pages': results[0].get('metadata', {}).get('pages', 0),
+            'has_images': len(images) > 0,
+            'total_images': len(images),
+            'total_text_length': sum(int(c.get('length', 0)) for c in text_chunks)
+        }
+    }
+
+
+def _completed_pdfs(extracted, parts_per_pdf):
+    """Yield (pdf_path, result, extract_ms) once every page range of a PDF is extracted"""
+    pending = {}
+    extract_ms = {}
+    for (pdf_name, start_page, _), result, elapsed_ms in extracted:
+        parts = pending.setdefault(pdf_name, [])
+        parts.append((start_page, result))
+        extract_ms[pdf_name] = extract_ms.get(pdf_name, 0.0) + elapsed_ms
+        if len(parts) == parts_per_pdf[pdf_name]:
+            del pending[pdf_name]
+            yield pdf_name, _merge_parts(parts), extract_ms.pop(pdf_name)
+
+
+def _write_image(img_path: Path, data: bytes):
+    """Write via a per-thread temp file and rename, so an interrupted run
+    never leaves a truncated image behind.
+
+    Uses a raw fd rather than open(): one-shot writes of a whole image
+    gain nothing from Python's buffered writer layer.
+    """
+    tmp_path = img_path.with_name(f".{img_path.name}.{threading.get_ident()}.tmp")
+    fd = os.open(tmp_path, _RAW_WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, img_path)
+
+
+def _store_images(processor, pacer, cache, batch):
+    """Thread pool job: save a batch of (img_idx, img_path, img_data) images
+    and describe the ones not in the cache with a single Vision request.
+
+    Returns (img_idx, manifest record) pairs; the record is None when no
+    OpenAI client is configured (image saved only).
+    """
+    saved = []
+    for img_idx, img_path, img_data in batch:
+        try:
+            # Drop the bytes from the dict once written, so a PDF waiting on
+            # its descriptions doesn't keep every extracted image in memory
+            _write_image(img_path, img_data.pop('image_data'))
+            saved.append((img_idx, img_path, img_data))
+        except Exception as e:
+            logger.warning(f"    Failed to store image {img_path.name}: {e}")
+    if not processor.client:
+        return [(img_idx, None) for img_idx, _, _ in saved]
+    
+    descriptions = {}
+    uncached = []
+    for _, img_path, img_data in saved:
+        img_hash = img_data['hash']
+        descriptions[img_hash] = cache.get(img_hash)
+        if descriptions[img_hash] is None:
+            uncached.append((img_path, img_hash))
+    if uncached:
+        pacer.wait()
+        generated = processor.generate_image_descriptions_batch([str(path) for path, _ in uncached])
+        for (_, img_hash), description in zip(uncached, generated):
+            descriptions[img_hash] = description
+            # Failed calls come back as "Error: ..." and are retried next run
+            if not description.startswith("Error:"):
+                cache.put(img_hash, description)
+    
+    return [(img_idx, {
+        'page': img_data['page'],
+        'caption': img_data['caption'],
+        'description': descriptions[img_data['hash']],
+        'hash': img_data['hash'],
+        'format': img_data['format'],
+        'size': img_data['size']
+    }) for img_idx, _, img_data in saved]
+
+
+def _finish_pdf(pdf_result: PdfResult, doc_images_dir, jobs) -> PdfResult:
+    """Collect a PDF's image jobs and write its manifest.
+
+    Images that could not be written or described are left out of the
+    manifest and the PDF is marked failed, so the checkpoint skips it and
+    the next run retries it (descriptions that succeeded come from the cache).
+    """
+    name = Path(pdf_result.filename).name
+    try:
+        manifest_lines = []
+        failed_images = []
+        for img_indices, future in jobs:
+            try:
+                stored = future.result()
+            except Exception as e:
+                logger.warning(f"    {name}: failed to store images {img_indices}: {e}")
+                failed_images.extend(img_indices)
+                continue
+            written = set()
+            for img_idx, record in stored:
+                written.add(img_idx)
+                if record is None:
+                    continue
+                if record['description'].startswith("Error:"):
+                    failed_images.append(img_idx)
+                else:
+                    manifest_lines.append(_json_bytes(record))
+            failed_images.extend(i for i in img_indices if i not in written)
+        
+        if manifest_lines:
+            with open(doc_images_dir / IMAGE_MANIFEST_FILE, 'wb') as f:
+                f.write(b"\n".join(manifest_lines) + b"\n")
+        pdf_result.stored_images = len(manifest_lines)
+        
+        if doc_images_dir is not None:
+            logger.info(f"  {name}: stored {pdf_result.stored_images}/{pdf_result.images} images with AI descriptions")
+        if failed_images:
+            logger.warning(f"  {name}: {len(failed_images)} images not stored or described, will retry next run")
+            pdf_result.status = 'failed'
+            pdf_result.error = f"{len(failed_images)} images not stored or described"
+    except Exception as e:
+        logger.error(f"Failed to process {name}: {e}")
+        pdf_result.status = 'failed'
+        pdf_result.error = str(e)
+    return pdf_result
+
+
+def _log_progress(done: int, total: int, done_bytes: int, total_bytes: int,
+                  extract_times_ms: list, elapsed: float):
+    """Progress with throughput, extraction-time percentiles and an ETA"""
+    times = sorted(extract_times_ms)
+    p50 = times[len(times) // 2]
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    bytes_per_s = done_bytes / elapsed if elapsed else 0.0
+    # PDFs run largest first, so the remaining count overstates the work
+    # left; estimate from remaining bytes at the observed byte rate instead
+    remaining = (total_bytes - done_bytes) / bytes_per_s if bytes_per_s else 0.0
+    logger.info(
+        f"\n>>> Progress: {done}/{total} PDFs "
+        f"({done / elapsed * 60:.1f} PDFs/min, {bytes_per_s / 1e6:.1f} MB/s)"
+    )
+    logger.info(f">>> Extraction time per PDF: p50 {p50 / 1000:.1f}s, p95 {p95 / 1000:.1f}s")
+    logger.info(f">>> Estimated time remaining: {remaining/60:.1f} minutes")
+
 
 def reprocess_all_pdfs():
     """Reprocess all PDFs with enhanced image extraction"""
@@ -39,110 +404,182 @@ def reprocess_all_pdfs():
     if not OPENAI_AVAILABLE:
         logger.warning("OpenAI not available - image descriptions will be skipped")
     
-    # Initialize processors
     kb_path = Path("data/knowledge_base")
-    processor = EnhancedKBProcessor(storage_dir=str(kb_path))
     
-    # Find all PDFs
-    pdf_files = list(kb_path.glob("*.pdf"))
+    # Find all PDFs, largest first: the biggest extractions start right away
+    # and small ones backfill idle workers instead of one big PDF at the end
+    # holding up the whole run
+    pdf_files = sorted(kb_path.glob("*.pdf"), key=lambda p: p.stat().st_size, reverse=True)
     logger.info(f"Found {len(pdf_files)} PDF files to process")
     
     if not pdf_files:
         logger.warning("No PDF files found in knowledge base directory")
         return
     
+    checkpoint = _JsonStore(kb_path / CHECKPOINT_FILE, CHECKPOINT_SAVE_EVERY)
+    fingerprints = {str(p): _fingerprint(p) for p in pdf_files}
+    skipped = 0
+    if not REPROCESS_ALL:
+        remaining = [p for p in pdf_files if checkpoint.get(p.stem) != fingerprints[str(p)]]
+        skipped = len(pdf_files) - len(remaining)
+        pdf_files = remaining
+        if skipped:
+            logger.info(f"Skipping {skipped} PDFs already processed (set REPROCESS_ALL=1 to redo them)")
+        if not pdf_files:
+            logger.info("All PDFs are up to date")
+            return
+    
+    # Initialize processors. All describe threads share one OpenAI client whose
+    # connection pool keeps a warm connection per concurrent request.
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=DESCRIBE_CONCURRENCY,
+            max_keepalive_connections=DESCRIBE_CONCURRENCY
+        ),
+        http2=HTTP2_AVAILABLE,
+        timeout=60.0
+    )
+    processor = EnhancedKBProcessor(storage_dir=str(kb_path), http_client=http_client)
+    
     # Process each PDF
-    stats = {
-        'total_pdfs': len(pdf_files),
-        'processed': 0,
-        'failed': 0,
-        'total_images': 0,
-        'total_text_chunks': 0
-    }
+    results = []
+    pdf_sizes = {str(p): p.stat().st_size for p in pdf_files}
+    total_bytes = sum(pdf_sizes.values())
+    done_bytes = 0
+    extract_times_ms = []
     
-    start_time = datetime.now()
+    def record(pdf_result: PdfResult):
+        results.append(pdf_result)
+        if pdf_result.status == 'ok':
+            checkpoint.put(Path(pdf_result.filename).stem, fingerprints[pdf_result.filename])
     
-    for idx, pdf_path in enumerate(pdf_files, 1):
+    start_time = time.perf_counter()
+    
+    logger.info(f"Extracting with {REPROCESS_WORKERS} worker processes")
+    log_queue = multiprocessing.Queue()
+    log_listener = logging.handlers.QueueListener(
+        log_queue, *logging.getLogger().handlers, respect_handler_level=True
+    )
+    log_listener.start()
+    pool = multiprocessing.Pool(
+        processes=REPROCESS_WORKERS,
+        initializer=_init_worker,
+        initargs=(str(kb_path), log_queue)
+    )
+    tasks, parts_per_pdf = _plan_extraction(processor, pdf_files)
+    if len(tasks) > len(pdf_files):
+        logger.info(f"Large PDFs split into page ranges: {len(tasks)} extraction tasks")
+    extracted = _completed_pdfs(pool.imap_unordered(_extract_pdf, tasks), parts_per_pdf)
+    describe_pool = ThreadPoolExecutor(max_workers=DESCRIBE_CONCURRENCY)
+    pacer = _RequestPacer(OPENAI_RPM_LIMIT)
+    description_cache = _JsonStore(processor.images_dir / DESCRIPTION_CACHE_FILE, DESCRIPTION_CACHE_SAVE_EVERY)
+    if len(description_cache):
+        logger.info(f"Loaded {len(description_cache)} cached image descriptions")
+    pending_pdfs = deque()
+    
+    for idx, (pdf_name, result, extract_ms) in enumerate(extracted, 1):
+        pdf_path = Path(pdf_name)
+        pdf_result = PdfResult(filename=pdf_name, time_ms=extract_ms)
+        extract_times_ms.append(extract_ms)
+        done_bytes += pdf_sizes[pdf_name]
         try:
             logger.info(f"\n[{idx}/{len(pdf_files)}] Processing: {pdf_path.name}")
             
-            # Extract full content with images
-            result = processor.extract_text_and_images(str(pdf_path))
-            
             if 'error' in result:
                 logger.error(f"Error processing {pdf_path.name}: {result['error']}")
-                stats['failed'] += 1
+                pdf_result.status = 'failed'
+                pdf_result.error = result['error']
+                record(pdf_result)
                 continue
             
             # Get metadata
             metadata = result.get('metadata', {})
             text_chunks = result.get('text_chunks', [])
-            images = result.get('images', [])
             
-            logger.info(f"  Pages: {metadata.get('pages', 0)}")
-            logger.info(f"  Text chunks: {len(text_chunks)}")
-            logger.info(f"  Images found: {len(images)}")
+            # PDFs often repeat the same logo/figure on every page; keep the
+            # first occurrence of each image so it is written and described once
+            seen_hashes = set()
+            images = []
+            for img_data in result.get('images', []):
+                img_hash = img_data['hash']
+                if img_hash not in seen_hashes:
+                    seen_hashes.add(img_hash)
+                    images.append(img_data)
             
-            # Store images and generate AI descriptions
-            stored_images = 0
+            logger.info(
+                f"  Pages: {metadata.get('pages', 0)}, text chunks: {len(text_chunks)}, "
+                f"images: {len(result.get('images', []))} ({len(images)} unique)"
+            )
+            pdf_result.pages = metadata.get('pages', 0)
+            pdf_result.text_chunks = len(text_chunks)
+            pdf_result.images = len(images)
+            
+            # Queue image writes and AI descriptions on the thread pool
+            jobs = []
+            doc_images_dir = None
             if images and OPENAI_AVAILABLE:
                 doc_id = pdf_path.stem
                 doc_images_dir = processor.images_dir / doc_id
                 doc_images_dir.mkdir(parents=True, exist_ok=True)
                 
+                submit = describe_pool.submit
+                batch = []
                 for img_idx, img_data in enumerate(images):
-                    try:
-                        img_hash = img_data['hash']
-                        img_path = doc_images_dir / f"{img_hash}.{img_data['format']}"
-                        
-                        # Save image
-                        with open(img_path, 'wb') as f:
-                            f.write(img_data['image_data'])
-                        
-                        # Generate AI description
-                        if processor.client:
-                            logger.info(f"    Generating AI description for image {img_idx + 1}/{len(images)}...")
-                            description = processor.generate_image_description(str(img_path))
-                            
-                            # Save metadata
-                            metadata_path = doc_images_dir / f"{img_hash}.json"
-                            import json
-                            with open(metadata_path, 'w') as f:
-                                json.dump({
-                                    'page': img_data['page'],
-                                    'caption': img_data['caption'],
-                                    'description': description,
-                                    'hash': img_hash,
-                                    'format': img_data['format'],
-                                    'size': img_data['size']
-                                }, f, indent=2)
-                            
-                            stored_images += 1
-                        
-                    except Exception as e:
-                        logger.warning(f"    Failed to store image {img_idx}: {e}")
+                    img_path = doc_images_dir / f"{img_data['hash']}.{img_data['format']}"
+                    batch.append((img_idx, img_path, img_data))
+                    if len(batch) == DESCRIBE_BATCH_SIZE or img_idx == len(images) - 1:
+                        jobs.append(([i for i, _, _ in batch], submit(
+                            _store_images, processor, pacer, description_cache, batch
+                        )))
+                        batch = []
                 
-                logger.info(f"  Stored {stored_images}/{len(images)} images with AI descriptions")
+                if processor.client:
+                    logger.debug(f"    Queued AI descriptions for {len(images)} images")
             
-            # Update statistics
-            stats['processed'] += 1
-            stats['total_images'] += len(images)
-            stats['total_text_chunks'] += len(text_chunks)
+            # Finish PDFs whose images are done, oldest first; block on the
+            # oldest only when too many are waiting
+            pending_pdfs.append((pdf_result, doc_images_dir, jobs))
+            while pending_pdfs and (
+                len(pending_pdfs) > MAX_PENDING_PDFS
+                or all(future.done() for _, future in pending_pdfs[0][2])
+            ):
+                record(_finish_pdf(*pending_pdfs.popleft()))
             
             # Progress report every 10 files
             if idx % 10 == 0:
-                elapsed = (datetime.now() - start_time).total_seconds()
-                avg_time = elapsed / idx
-                remaining = (len(pdf_files) - idx) * avg_time
-                logger.info(f"\n>>> Progress: {idx}/{len(pdf_files)} PDFs")
-                logger.info(f">>> Estimated time remaining: {remaining/60:.1f} minutes")
+                _log_progress(idx, len(pdf_files), done_bytes, total_bytes,
+                              extract_times_ms, time.perf_counter() - start_time)
             
         except Exception as e:
             logger.error(f"Failed to process {pdf_path.name}: {e}")
-            stats['failed'] += 1
+            pdf_result.status = 'failed'
+            pdf_result.error = str(e)
+            record(pdf_result)
+    
+    while pending_pdfs:
+        record(_finish_pdf(*pending_pdfs.popleft()))
+    
+    pool.close()
+    pool.join()
+    log_listener.stop()
+    describe_pool.shutdown()
+    description_cache.save()
+    checkpoint.save()
+    http_client.close()
     
     # Final statistics
-    elapsed_time = (datetime.now() - start_time).total_seconds()
+    elapsed_time = time.perf_counter() - start_time
+    succeeded = [r for r in results if r.status == 'ok']
+    failures = [r for r in results if r.status != 'ok']
+    stats = {
+        'total_pdfs': len(pdf_files),
+        'skipped': skipped,
+        'processed': len(succeeded),
+        'failed': len(failures),
+        'total_images': sum(r.images for r in succeeded),
+        'total_text_chunks': sum(r.text_chunks for r in succeeded),
+        'failures': [asdict(r) for r in failures]
+    }
     logger.info("\n" + "="*60)
     logger.info("REPROCESSING COMPLETE")
     logger.info("="*60)
@@ -157,13 +594,12 @@ def reprocess_all_pdfs():
     
     # Save statistics
     stats_path = kb_path / "reprocessing_stats.json"
-    import json
-    with open(stats_path, 'w') as f:
-        json.dump({
+    with open(stats_path, 'wb') as f:
+        f.write(_json_bytes({
             **stats,
             'elapsed_seconds': elapsed_time,
             'timestamp': datetime.now().isoformat()
-        }, f, indent=2)
+        }, indent=True))
     
     logger.info(f"\nStatistics saved to: {stats_path}")
 
@@ -1,27 +1,29 @@
+from sqlalchemy import case, distinct, func
+
 from app.models import KnowledgeDocument
 from app.database import SessionLocal
 
 db = SessionLocal()
 try:
-    db_docs = db.query(KnowledgeDocument).all()
-    db_doc_count = len(db_docs)
-    db_total_chunks = sum(doc.chunk_count or 0 for doc in db_docs)
-    
-    db_categories = set()
-    for doc in db_docs:
-        if doc.category and doc.category.strip():
-            db_categories.add(doc.category.strip())
-    
+    # Aggregate in the database instead of loading every document row
+    category = func.trim(KnowledgeDocument.category)
+    db_doc_count, db_total_chunks, db_category_count = db.query(
+        func.count(KnowledgeDocument.id),
+        func.coalesce(func.sum(KnowledgeDocument.chunk_count), 0),
+        func.count(distinct(case((category != '', category))))
+    ).one()
+
     print("[OK] Database Statistics:")
     print(f"  Total Documents: {db_doc_count}")
     print(f"  Total Chunks: {db_total_chunks}")
-    print(f"  Unique Categories: {len(db_categories)}")
-    
-    if db_docs:
+    print(f"  Unique Categories: {db_category_count}")
+
+    if db_doc_count:
         print(f"\n  Sample documents:")
-        for doc in db_docs[:3]:
-            print(f"    - {doc.filename}: {doc.chunk_count} chunks")
-    
+        sample = db.query(KnowledgeDocument.filename, KnowledgeDocument.chunk_count).limit(3)
+        for filename, chunk_count in sample:
+            print(f"    - {filename}: {chunk_count} chunks")
+
     print("\n[SUCCESS] The backend statistics endpoint should now return correct values")
 finally:
     db.close()
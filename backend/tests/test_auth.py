@@ -6,6 +6,10 @@ import json
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# One session for the whole run so every request reuses the same
+# keep-alive connection instead of reconnecting per call
+session = requests.Session()
+
 def test_register():
     """Test user registration"""
     print("\n=== Testing User Registration ===")
@@ -21,7 +25,7 @@ def test_register():
         "phone": "+1234567890"
     }
     
-    response = requests.post(url, json=data)
+    response = session.post(url, json=data)
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 201:
@@ -46,7 +50,7 @@ def test_login(email, password):
         "password": password
     }
     
-    response = requests.post(url, json=data)
+    response = session.post(url, json=data)
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 200:
@@ -69,7 +73,7 @@ def test_get_current_user(token):
         "Authorization": f"Bearer {token}"
     }
     
-    response = requests.get(url, headers=headers)
+    response = session.get(url, headers=headers)
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 200:
@@ -101,7 +105,7 @@ def test_register_patient():
         "date_of_birth": "1990-05-15"
     }
     
-    response = requests.post(url, json=data)
+    response = session.post(url, json=data)
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 201:
@@ -125,7 +129,7 @@ def test_invalid_login():
         "password": "WrongPassword123!"
     }
     
-    response = requests.post(url, json=data)
+    response = session.post(url, json=data)
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 401:
@@ -185,6 +189,8 @@ def main():
         print("Please ensure the backend is running on http://127.0.0.1:8001")
     except Exception as e:
         print(f"\n[ERROR] ERROR: {str(e)}")
+    finally:
+        session.close()
 
 
 if __name__ == "__main__":
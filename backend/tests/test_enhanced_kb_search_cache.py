@@ -0,0 +1,55 @@
+"""
+EnhancedKnowledgeBase search cache tests
+Repeated searches are served from the cache, and adding a document clears it
+so new content shows up immediately.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services import enhanced_knowledge_base
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    # Keyword search only: no model download, no semantic rerank
+    monkeypatch.setattr(enhanced_knowledge_base, "SENTENCE_TRANSFORMERS_AVAILABLE", False)
+    return enhanced_knowledge_base.EnhancedKnowledgeBase(storage_dir=str(tmp_path))
+
+
+def sources(results):
+    return [result["source"] for result in results]
+
+
+def test_repeated_search_is_cached(kb):
+    first = kb.search("fever cough", top_k=3)
+    assert len(kb._search_cache) == 1
+
+    # Same normalized query hits the cache; results are copies
+    second = kb.search("  Fever   COUGH ", top_k=3)
+    assert sources(second) == sources(first)
+    assert len(kb._search_cache) == 1
+    second[0]["score"] = -1
+    assert kb.search("fever cough", top_k=3)[0]["score"] == first[0]["score"]
+
+
+def test_add_document_clears_cache(kb):
+    assert kb.search("quokkafever", top_k=5) == []
+    assert len(kb._search_cache) == 1
+
+    kb.add_document("Quokkafever is treated with rest and fluids.", "quokkafever notes", {"type": "guideline"})
+    assert len(kb._search_cache) == 0
+
+    assert "Medical Database - quokkafever notes" in sources(kb.search("quokkafever", top_k=5))
+
+
+def test_cache_is_bounded(kb, monkeypatch):
+    monkeypatch.setattr(kb, "SEARCH_CACHE_MAXSIZE", 2)
+    for query in ("fever", "cough", "headache"):
+        kb.search(query)
+    assert [query for query, _ in kb._search_cache] == ["cough", "headache"]
@@ -0,0 +1,73 @@
+"""
+Password verification cache tests
+Successful bcrypt checks are cached for VERIFY_CACHE_TTL seconds; after that
+the next login must pay for a full bcrypt verify again.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+pytest.importorskip("bcrypt")
+
+from app.utils import security
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock plus a count of real bcrypt checks"""
+    state = SimpleNamespace(now=1000.0, checks=0)
+    monkeypatch.setattr(security, "time", SimpleNamespace(monotonic=lambda: state.now))
+
+    check_password = security._check_password
+
+    def counting_check(plain_password, hashed_password):
+        state.checks += 1
+        return check_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(security, "_check_password", counting_check)
+    security.clear_verify_cache()
+    yield state
+    security.clear_verify_cache()
+
+
+@pytest.fixture(scope="module")
+def hashed():
+    return security.hash_password("correct horse")
+
+
+def test_success_is_cached_until_ttl(clock, hashed):
+    assert security.verify_password("correct horse", hashed)
+    assert clock.checks == 1
+
+    clock.now += security.VERIFY_CACHE_TTL - 1
+    assert security.verify_password("correct horse", hashed)
+    assert clock.checks == 1
+
+
+def test_expired_entry_is_verified_again(clock, hashed):
+    assert security.verify_password("correct horse", hashed)
+
+    clock.now += security.VERIFY_CACHE_TTL + 1
+    assert security.verify_password("correct horse", hashed)
+    assert clock.checks == 2
+
+    # The fresh success is cached again
+    assert security.verify_password("correct horse", hashed)
+    assert clock.checks == 2
+
+
+def test_failures_are_not_cached(clock, hashed):
+    assert not security.verify_password("wrong", hashed)
+    assert not security.verify_password("wrong", hashed)
+    assert clock.checks == 2
+
+
+def test_non_string_password_is_rejected(clock, hashed):
+    assert not security.verify_password(None, hashed)
+    assert not security.verify_password(b"correct horse", hashed)
@@ -0,0 +1,158 @@
+"""
+reprocess_pdfs_with_images tests
+Runs the whole reprocessing loop in-process with a fake extractor and a fake
+Vision client: repeated images are stored once, finished PDFs are skipped on
+the next run, and PDFs with failed image descriptions are retried.
+"""
+import json
+import queue
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import reprocess_pdfs_with_images as reprocess
+
+
+class FakeProcessor:
+    """Stands in for EnhancedKBProcessor: page counts and batched descriptions"""
+
+    failing_images = set()  # Image hashes whose description comes back as an error
+    described = []  # Image hashes sent to the Vision API, in order
+
+    def __init__(self, storage_dir, http_client=None):
+        self.images_dir = Path(storage_dir) / "images"
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        self.client = object()
+
+    def count_pages(self, pdf_path):
+        return 1
+
+    def generate_image_descriptions_batch(self, image_paths):
+        hashes = [Path(path).stem for path in image_paths]
+        FakeProcessor.described.extend(hashes)
+        return [
+            "Error: rate limited" if img_hash in FakeProcessor.failing_images else f"description of {img_hash}"
+            for img_hash in hashes
+        ]
+
+
+class FakeExtractor:
+    """Worker-side extraction: each fake PDF is a JSON list of image hashes per page"""
+
+    def extract_text_and_images(self, pdf_path, start_page=0, end_page=None):
+        pages = json.loads(Path(pdf_path).read_text())
+        images = [
+            {'hash': img_hash, 'format': 'png', 'page': page, 'caption': '', 'size': 4,
+             'image_data': img_hash.encode('ascii')[:4]}
+            for page, hashes in enumerate(pages, 1) for img_hash in hashes
+        ]
+        return {
+            'text_chunks': [{'text': f'page {page}', 'length': 6} for page in range(1, len(pages) + 1)],
+            'images': images,
+            'metadata': {'pages': len(pages)},
+        }
+
+
+class InProcessPool:
+    def __init__(self, processes, initializer=None, initargs=()):
+        pass
+
+    def imap_unordered(self, func, iterable):
+        return map(func, iterable)
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+@pytest.fixture
+def kb_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(reprocess, "PYMUPDF_AVAILABLE", True)
+    monkeypatch.setattr(reprocess, "OPENAI_AVAILABLE", True)
+    monkeypatch.setattr(reprocess, "REPROCESS_ALL", False)
+    monkeypatch.setattr(reprocess, "EnhancedKBProcessor", FakeProcessor)
+    monkeypatch.setattr(reprocess, "multiprocessing", SimpleNamespace(Pool=InProcessPool, Queue=queue.Queue))
+    monkeypatch.setattr(reprocess, "_worker_processor", FakeExtractor())
+    monkeypatch.setattr(FakeProcessor, "failing_images", set())
+    monkeypatch.setattr(FakeProcessor, "described", [])
+    kb_dir = tmp_path / "data" / "knowledge_base"
+    kb_dir.mkdir(parents=True)
+    return kb_dir
+
+
+def write_pdf(kb_dir, name, pages):
+    (kb_dir / name).write_text(json.dumps(pages))
+
+
+def read_manifest(kb_dir, stem):
+    manifest = kb_dir / "images" / stem / reprocess.IMAGE_MANIFEST_FILE
+    return [json.loads(line) for line in manifest.read_text().splitlines()]
+
+
+def read_stats(kb_dir):
+    return json.loads((kb_dir / "reprocessing_stats.json").read_text())
+
+
+def test_repeated_images_are_stored_and_described_once(kb_dir):
+    # A logo on every page plus one figure
+    write_pdf(kb_dir, "guide.pdf", [["logo"], ["logo", "figure"], ["logo"]])
+
+    reprocess.reprocess_all_pdfs()
+
+    assert sorted(FakeProcessor.described) == ["figure", "logo"]
+    assert sorted(record['hash'] for record in read_manifest(kb_dir, "guide")) == ["figure", "logo"]
+    assert sorted(p.name for p in (kb_dir / "images" / "guide").glob("*.png")) == ["figure.png", "logo.png"]
+    assert read_stats(kb_dir)['total_images'] == 2
+
+
+def test_processed_pdfs_are_skipped_until_changed(kb_dir):
+    write_pdf(kb_dir, "a.pdf", [["a1"]])
+    write_pdf(kb_dir, "b.pdf", [["b1"]])
+    reprocess.reprocess_all_pdfs()
+    assert set(json.loads((kb_dir / reprocess.CHECKPOINT_FILE).read_text())) == {"a", "b"}
+
+    # Nothing changed: the second run has no work
+    (kb_dir / "reprocessing_stats.json").unlink()
+    reprocess.reprocess_all_pdfs()
+    assert not (kb_dir / "reprocessing_stats.json").exists()
+
+    # An edited PDF (new size) is redone; descriptions come from the cache
+    FakeProcessor.described.clear()
+    write_pdf(kb_dir, "b.pdf", [["b1"], ["b2"]])
+    reprocess.reprocess_all_pdfs()
+    stats = read_stats(kb_dir)
+    assert (stats['skipped'], stats['processed']) == (1, 1)
+    assert FakeProcessor.described == ["b2"]
+
+
+def test_failed_descriptions_are_not_checkpointed(kb_dir):
+    write_pdf(kb_dir, "a.pdf", [["a1", "a2"]])
+    write_pdf(kb_dir, "b.pdf", [["b1"]])
+    FakeProcessor.failing_images = {"a2"}
+
+    reprocess.reprocess_all_pdfs()
+
+    assert read_stats(kb_dir)['failed'] == 1
+    assert set(json.loads((kb_dir / reprocess.CHECKPOINT_FILE).read_text())) == {"b"}
+    # The error text never reaches the manifest
+    assert [record['hash'] for record in read_manifest(kb_dir, "a")] == ["a1"]
+
+    # Next run retries only the failed PDF and only the failed description
+    FakeProcessor.failing_images = set()
+    FakeProcessor.described.clear()
+    reprocess.reprocess_all_pdfs()
+
+    stats = read_stats(kb_dir)
+    assert (stats['skipped'], stats['processed'], stats['failed']) == (1, 1, 0)
+    assert FakeProcessor.described == ["a2"]
+    assert sorted(record['hash'] for record in read_manifest(kb_dir, "a")) == ["a1", "a2"]
+    assert set(json.loads((kb_dir / reprocess.CHECKPOINT_FILE).read_text())) == {"a", "b"}
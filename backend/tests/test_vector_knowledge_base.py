@@ -0,0 +1,87 @@
+"""
+VectorKnowledgeBase delete path tests
+Deleting a document removes its vectors in place; the remaining chunks must
+still map to the right index positions afterwards.
+"""
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+faiss = pytest.importorskip("faiss")
+
+from app.services.vector_knowledge_base import VectorKnowledgeBase
+
+DIMENSION = 16
+
+
+def fake_embedding(text):
+    """Deterministic stand-in for an OpenAI embedding"""
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    return rng.standard_normal(DIMENSION).astype("float32")
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    kb = VectorKnowledgeBase(storage_dir=str(tmp_path), embedding_dimension=DIMENSION)
+    kb.openai_client = object()  # Only checked for truthiness once embeddings are faked
+    kb._get_embedding = fake_embedding
+    kb._get_embeddings_batch = lambda texts, batch_size=100: [fake_embedding(t) for t in texts]
+    return kb
+
+
+DOCUMENTS = {
+    "doc-a": "Asthma is a chronic inflammatory disease of the airways.",
+    "doc-b": "Hypertension is persistently raised arterial blood pressure.",
+    "doc-c": "Anaemia is a decrease in red blood cells or haemoglobin.",
+}
+
+
+def add_all(kb):
+    for document_id, content in DOCUMENTS.items():
+        assert kb.add_document(content, {"document_id": document_id, "filename": f"{document_id}.txt"}) == 1
+
+
+def test_delete_then_search_returns_remaining_documents(kb):
+    add_all(kb)
+
+    assert kb.delete_document("doc-b") == 1
+    assert kb.index.ntotal == len(kb.documents) == 2
+
+    # Each remaining chunk is still its own nearest neighbour
+    for document_id in ("doc-a", "doc-c"):
+        results = kb.search(DOCUMENTS[document_id], top_k=1)
+        assert results[0]["metadata"]["document_id"] == document_id
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-4)
+
+    found = {r["metadata"]["document_id"] for r in kb.search(DOCUMENTS["doc-b"], top_k=5)}
+    assert "doc-b" not in found
+
+
+def test_chunk_positions_follow_deletes(kb):
+    add_all(kb)
+
+    kb.delete_document("doc-a")
+    assert kb._chunk_positions == {"doc-b": [0], "doc-c": [1]}
+    assert kb.delete_document("doc-a") == 0
+
+    # Positions of documents added after a delete continue from the end
+    kb.add_document("Gout is caused by urate crystal deposition.", {"document_id": "doc-d"})
+    assert kb._chunk_positions["doc-d"] == [2]
+    assert kb.search("Gout is caused by urate crystal deposition.", top_k=1)[0]["metadata"]["document_id"] == "doc-d"
+
+
+def test_deletes_survive_reload(kb, tmp_path):
+    add_all(kb)
+    kb.delete_document("doc-c")
+
+    reloaded = VectorKnowledgeBase(storage_dir=str(tmp_path), embedding_dimension=DIMENSION)
+    assert reloaded.index.ntotal == 2
+    assert set(reloaded._chunk_positions) == {"doc-a", "doc-b"}
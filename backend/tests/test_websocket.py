@@ -12,14 +12,14 @@ from datetime import datetime
 WS_URL = "ws://127.0.0.1:8001/ws/test_user"
 
 @pytest.mark.asyncio
-async def test_diagnosis_streaming():
+async def test_diagnosis_streaming(ws_url: str = WS_URL):
     """Test real-time diagnosis streaming with progress updates."""
     print("\n" + "="*60)
     print("TEST: Diagnosis Streaming")
     print("="*60)
     
     try:
-        async with websockets.connect(WS_URL) as websocket:
+        async with websockets.connect(ws_url) as websocket:
             # Send diagnosis request
             request = {
                 "type": "diagnosis",
@@ -98,14 +98,14 @@ async def test_diagnosis_streaming():
 
 
 @pytest.mark.asyncio
-async def test_prescription_streaming():
+async def test_prescription_streaming(ws_url: str = WS_URL):
     """Test real-time prescription streaming with progress updates."""
     print("\n" + "="*60)
     print("TEST: Prescription Streaming")
     print("="*60)
     
     try:
-        async with websockets.connect(WS_URL) as websocket:
+        async with websockets.connect(ws_url) as websocket:
             # Send prescription request
             request = {
                 "type": "prescription",
@@ -179,14 +179,14 @@ async def test_prescription_streaming():
 
 
 @pytest.mark.asyncio
-async def test_chat_message():
+async def test_chat_message(ws_url: str = WS_URL):
     """Test simple chat message (non-streaming)."""
     print("\n" + "="*60)
     print("TEST: Chat Message")
     print("="*60)
     
     try:
-        async with websockets.connect(WS_URL) as websocket:
+        async with websockets.connect(ws_url) as websocket:
             # Send chat message
             request = {
                 "type": "chat",
@@ -214,14 +214,14 @@ async def test_chat_message():
 
 
 @pytest.mark.asyncio
-async def test_error_handling():
+async def test_error_handling(ws_url: str = WS_URL):
     """Test error handling with invalid message type."""
     print("\n" + "="*60)
     print("TEST: Error Handling")
     print("="*60)
     
     try:
-        async with websockets.connect(WS_URL) as websocket:
+        async with websockets.connect(ws_url) as websocket:
             # Send invalid message type
             request = {
                 "type": "invalid_type",
@@ -254,19 +254,20 @@ async def run_all_tests():
     print("WEBSOCKET STREAMING TEST SUITE")
     print("="*70)
     
-    results = {}
-    
-    # Run tests
-    results["diagnosis_streaming"] = await test_diagnosis_streaming()
-    await asyncio.sleep(1)  # Brief pause between tests
-    
-    results["prescription_streaming"] = await test_prescription_streaming()
-    await asyncio.sleep(1)
-    
-    results["chat_message"] = await test_chat_message()
-    await asyncio.sleep(1)
-    
-    results["error_handling"] = await test_error_handling()
+    # The tests share no state, so they run concurrently. Each gets its own
+    # user id because the server keeps one connection per user; output from
+    # different tests may interleave.
+    tests = {
+        "diagnosis_streaming": test_diagnosis_streaming,
+        "prescription_streaming": test_prescription_streaming,
+        "chat_message": test_chat_message,
+        "error_handling": test_error_handling,
+    }
+    outcomes = await asyncio.gather(
+        *(test(f"{WS_URL}_{name}") for name, test in tests.items()),
+        return_exceptions=True
+    )
+    results = {name: outcome is True for name, outcome in zip(tests, outcomes)}
     
     # Summary
     print("\n" + "="*70)